@@ -1,27 +1,165 @@
-from flask import Flask, request, jsonify
+from flask import Blueprint, Flask, Response, current_app, g, has_app_context, has_request_context, request, jsonify, stream_with_context
+from flask.cli import AppGroup
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
-from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
-from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime, timedelta
+from flask_sqlalchemy.session import Session as BaseSession
+from flask_migrate import Migrate, stamp, upgrade
+from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity, verify_jwt_in_request
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError, SQLAlchemyError
+from sqlalchemy.orm import Session
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+from werkzeug.exceptions import HTTPException
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, generate_password_hash, check_password_hash
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, date, timedelta, timezone
+from decimal import Decimal
+from collections import OrderedDict
+from functools import wraps
+from operator import attrgetter
+from urllib.parse import urlsplit
+import base64
+import hashlib
+import heapq
+import itertools
+import csv
+import io
+import json
+import logging
+import math
+import multiprocessing
 import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
 from dotenv import load_dotenv
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 load_dotenv()
 
-app = Flask(__name__)
-# Handle PostgreSQL URL from Render (postgres:// -> postgresql://)
-database_url = os.getenv('DATABASE_URL', 'sqlite:///crm.db')
-if database_url.startswith('postgres://'):
-    database_url = database_url.replace('postgres://', 'postgresql://', 1)
-app.config['SQLALCHEMY_DATABASE_URI'] = database_url
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'your-secret-key-change-in-production')
-app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=24)
+# prometheus_client writes multiprocess samples into this directory from the
+# first one on. gunicorn's on_starting clears it for each server, but
+# commands that run before the server, such as init-db, need it too.
+if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+    os.makedirs(os.getenv('PROMETHEUS_MULTIPROC_DIR'), exist_ok=True)
+
+# JSON encoding: orjson when installed, stdlib otherwise. Both emit
+# datetimes as ISO 8601, unlike Flask's default HTTP-date format.
+def json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+def dumps_json(obj):
+    if orjson:
+        return orjson.dumps(obj, default=json_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=json_default, separators=(',', ':')).encode()
+
+class FastJSONProvider(DefaultJSONProvider):
+    def dumps(self, obj, **kwargs):
+        return dumps_json(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s) if orjson else json.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps_json(obj), mimetype=self.mimetype)
+
+# Statements go to the read replica chosen for the request, if there is one
+# (see "Read replicas"); flushes and INSERT/UPDATE/DELETE always go to the
+# primary
+class RoutingSession(BaseSession):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and not getattr(clause, 'is_dml', False) and has_app_context():
+            key = request_replica()
+            if key is not None:
+                return self._db.engines[key]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+migrate = Migrate()
+jwt = JWTManager()
+api = Blueprint('api', __name__, cli_group=None)
+
+# Search objects created by raw DDL (see SEARCH_DDL) are invisible to the
+# model metadata; keep autogenerate and `db check` from proposing to drop them.
+def include_schema_object(obj, name, type_, reflected, compare_to):
+    if type_ == 'table' and name.startswith('search_fts'):
+        return False
+    return name not in ('search_vector', 'ix_search_document_vector')
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
+def normalize_database_url(url):
+    # Handle PostgreSQL URL from Render (postgres:// -> postgresql://)
+    if url.startswith('postgres://'):
+        url = url.replace('postgres://', 'postgresql://', 1)
+    return url
+
+def engine_options(url):
+    # Pools are per worker process and per database: keep GUNICORN_THREADS <=
+    # DB_POOL_SIZE + DB_MAX_OVERFLOW, and workers * (pool + overflow) under
+    # each server's connection limit. Pre-ping and recycle drop connections
+    # the database or a proxy closed while they sat idle.
+    options = {
+        'pool_pre_ping': os.getenv('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes'),
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 1800)),
+    }
+    if not url.startswith('sqlite'):
+        options.update(
+            pool_size=int(os.getenv('DB_POOL_SIZE', 5)),
+            max_overflow=int(os.getenv('DB_MAX_OVERFLOW', 5)),
+            pool_timeout=int(os.getenv('DB_POOL_TIMEOUT', 10)),
+        )
+    return options
 
-db = SQLAlchemy(app)
-jwt = JWTManager(app)
-CORS(app)
+# Application factory. Building the app only reads configuration; nothing
+# touches the database until a request or CLI command does, so worker boots
+# stay fast. Schema setup is the one-shot `flask --app app init-db`.
+def create_app(config=None):
+    app = Flask(__name__)
+    database_url = normalize_database_url(os.getenv('DATABASE_URL', 'sqlite:///crm.db'))
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_url
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(database_url)
+    # Read replicas are extra binds that no model belongs to; RoutingSession
+    # sends a request's reads to one of them (see "Read replicas")
+    replica_urls = [normalize_database_url(url.strip()) for url in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+    app.config['SQLALCHEMY_BINDS'] = {f'replica{i}': dict(engine_options(url), url=url) for i, url in enumerate(replica_urls)}
+    app.config['REPLICA_BINDS'] = list(app.config['SQLALCHEMY_BINDS'])
+    app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'your-secret-key-change-in-production')
+    app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=24)
+    if config:
+        app.config.update(config)
+
+    app.json = FastJSONProvider(app)
+    db.init_app(app)
+    migrate.init_app(app, db, directory=MIGRATIONS_DIR, include_object=include_schema_object)
+    jwt.init_app(app)
+    CORS(app)
+    app.register_blueprint(api)
+    return app
+
+# SQLite enforces foreign keys, and with them the ON DELETE actions the
+# models declare, only when asked to on each connection
+@db.event.listens_for(Engine, 'connect')
+def enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.execute('PRAGMA foreign_keys=ON')
 
 # Database Models
 class User(db.Model):
@@ -41,8 +179,24 @@ class Customer(db.Model):
     status = db.Column(db.String(50), default='active')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    external_id = db.Column(db.String(100))
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
 
+    # Only ever loaded through explicit queries (see customer_overview), so a
+    # stray per-row lazy load fails loudly instead of fanning out. Child rows
+    # are removed by the database's ON DELETE CASCADE, never loaded to be
+    # deleted one by one (see cascade_customer_delete).
+    contacts = db.relationship('Contact', lazy='raise', cascade='all, delete', passive_deletes=True)
+    deals = db.relationship('Deal', lazy='raise', cascade='all, delete', passive_deletes=True)
+    activities = db.relationship('Activity', lazy='raise', cascade='all, delete', passive_deletes=True)
+    archived_activities = db.relationship('ActivityArchive', lazy='raise', cascade='all, delete', passive_deletes=True)
+
+    __table_args__ = (
+        db.Index('ix_customer_user_external', 'user_id', 'external_id', unique=True),
+        db.Index('ix_customer_user_status', 'user_id', 'status'),
+        db.Index('ix_customer_user_updated', 'user_id', 'updated_at', 'id'),
+    )
+
 class Contact(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     first_name = db.Column(db.String(100), nullable=False)
@@ -50,11 +204,21 @@ class Contact(db.Model):
     email = db.Column(db.String(120))
     phone = db.Column(db.String(20))
     position = db.Column(db.String(100))
-    customer_id = db.Column(db.Integer, db.ForeignKey('customer.id'), nullable=False)
+    customer_id = db.Column(db.Integer, db.ForeignKey('customer.id', ondelete='CASCADE'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    external_id = db.Column(db.String(100))
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
 
+    __table_args__ = (
+        # The database looks children up by the bare foreign key when it
+        # cascades, so each one needs an index of its own
+        db.Index('ix_contact_customer', 'customer_id'),
+        db.Index('ix_contact_user_external', 'user_id', 'external_id', unique=True),
+        db.Index('ix_contact_user_customer_updated', 'user_id', 'customer_id', 'updated_at', 'id'),
+        db.Index('ix_contact_user_updated', 'user_id', 'updated_at', 'id'),
+    )
+
 class Deal(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
@@ -62,11 +226,21 @@ class Deal(db.Model):
     stage = db.Column(db.String(50), default='prospecting')
     probability = db.Column(db.Integer, default=0)
     expected_close_date = db.Column(db.Date)
-    customer_id = db.Column(db.Integer, db.ForeignKey('customer.id'), nullable=False)
+    customer_id = db.Column(db.Integer, db.ForeignKey('customer.id', ondelete='CASCADE'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    external_id = db.Column(db.String(100))
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
 
+    __table_args__ = (
+        db.Index('ix_deal_customer', 'customer_id'),
+        db.Index('ix_deal_user_external', 'user_id', 'external_id', unique=True),
+        # Covers the forecast scan: grouped in index order, no table visits
+        db.Index('ix_deal_user_stage_close', 'user_id', 'stage', 'expected_close_date', 'value', 'probability', 'created_at', 'updated_at'),
+        db.Index('ix_deal_user_customer_updated', 'user_id', 'customer_id', 'updated_at', 'id'),
+        db.Index('ix_deal_user_updated', 'user_id', 'updated_at', 'id'),
+    )
+
 class Activity(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     type = db.Column(db.String(50), nullable=False)  # call, email, meeting, note
@@ -74,14 +248,519 @@ class Activity(db.Model):
     description = db.Column(db.Text)
     due_date = db.Column(db.DateTime)
     completed = db.Column(db.Boolean, default=False)
-    customer_id = db.Column(db.Integer, db.ForeignKey('customer.id'))
-    deal_id = db.Column(db.Integer, db.ForeignKey('deal.id'))
+    customer_id = db.Column(db.Integer, db.ForeignKey('customer.id', ondelete='CASCADE'))
+    # Activities outlive their deal; they stay with the customer
+    deal_id = db.Column(db.Integer, db.ForeignKey('deal.id', ondelete='SET NULL'))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    external_id = db.Column(db.String(100))
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
 
+    deal = db.relationship('Deal', lazy='raise')
+
+    __table_args__ = (
+        db.Index('ix_activity_customer', 'customer_id'),
+        db.Index('ix_activity_deal', 'deal_id'),
+        db.Index('ix_activity_user_external', 'user_id', 'external_id', unique=True),
+        db.Index('ix_activity_user_customer_updated', 'user_id', 'customer_id', 'updated_at', 'id'),
+        db.Index('ix_activity_user_deal_updated', 'user_id', 'deal_id', 'updated_at', 'id'),
+        db.Index('ix_activity_user_updated', 'user_id', 'updated_at', 'id'),
+        db.Index('ix_activity_user_completed_due', 'user_id', 'completed', 'due_date', 'id'),
+        db.Index('ix_activity_completed_due', 'completed', 'due_date'),
+        # SQLite would otherwise hand a deleted or archived row's id to the
+        # next insert; PostgreSQL sequences never reuse one
+        {'sqlite_autoincrement': True},
+    )
+
+# Completed activities moved out of the hot table by archive_activities.
+# Rows keep their original id, so tombstones and clients agree on identity;
+# activity ids are never reused, so an id is archived at most once.
+class ActivityArchive(db.Model):
+    __tablename__ = 'activity_archive'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    type = db.Column(db.String(50), nullable=False)
+    subject = db.Column(db.String(200), nullable=False)
+    description = db.Column(db.Text)
+    due_date = db.Column(db.DateTime)
+    completed = db.Column(db.Boolean, default=False)
+    customer_id = db.Column(db.Integer, db.ForeignKey('customer.id', ondelete='CASCADE'))
+    deal_id = db.Column(db.Integer, db.ForeignKey('deal.id', ondelete='SET NULL'))
+    created_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)
+    external_id = db.Column(db.String(100))
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_activity_archive_customer', 'customer_id'),
+        db.Index('ix_activity_archive_deal', 'deal_id'),
+        db.Index('ix_activity_archive_user_updated', 'user_id', 'updated_at', 'id'),
+    )
+
+# Reminder and overdue events emitted by the reminder scheduler. One row per
+# (activity, kind, due date): every worker process runs a scheduler, and the
+# unique key lets them race to emit the same event without duplicating it.
+class Reminder(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)  # reminder, overdue
+    due_date = db.Column(db.DateTime, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    activity_id = db.Column(db.Integer, db.ForeignKey('activity.id', ondelete='CASCADE'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_reminder_activity_kind_due', 'activity_id', 'kind', 'due_date', unique=True),
+        db.Index('ix_reminder_user_id', 'user_id', 'id'),
+    )
+
+# Per-user pipeline totals, maintained incrementally by the deal write routes.
+# Deals without a stage are stored under '' since stage is part of the key.
+class DealStageSummary(db.Model):
+    __tablename__ = 'deal_stage_summary'
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    stage = db.Column(db.String(50), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    total_value = db.Column(db.Float, nullable=False, default=0)
+    weighted_value = db.Column(db.Float, nullable=False, default=0)
+
+# Per-user change counters for each entity table, bumped in the same
+# transaction as every write; list ETags are derived from them
+class CollectionVersion(db.Model):
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    resource = db.Column(db.String(20), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+# Records hard deletes so sync clients can remove rows from their replicas
+class Tombstone(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    resource = db.Column(db.String(20), nullable=False)
+    row_id = db.Column(db.Integer, nullable=False)
+    deleted_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_tombstone_user_deleted', 'user_id', 'deleted_at', 'id'),
+    )
+
+# One row per searchable entity, rewritten by the write routes. The full-text
+# index on top is dialect specific (see SEARCH_DDL) and kept in step with this
+# table by the database itself.
+class SearchDocument(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    resource = db.Column(db.String(20), nullable=False)
+    row_id = db.Column(db.Integer, nullable=False)
+    label = db.Column(db.String(300), nullable=False)
+    body = db.Column(db.Text)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_search_document_row', 'resource', 'row_id', unique=True),
+    )
+
+# PostgreSQL: a weighted tsvector generated column behind a (user_id, vector)
+# GIN index. SQLite: an FTS5 table fed by triggers, with the user as an
+# indexed token so per-user filtering happens inside the full-text index.
+SEARCH_DDL = {
+    'postgresql': [
+        "CREATE EXTENSION IF NOT EXISTS btree_gin",
+        "ALTER TABLE search_document ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('simple', coalesce(label, '')), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(body, '')), 'B')) STORED",
+        "CREATE INDEX ix_search_document_vector ON search_document USING gin (user_id, search_vector)",
+    ],
+    'sqlite': [
+        "CREATE VIRTUAL TABLE search_fts USING fts5("
+        "user_key, label, body, resource UNINDEXED, row_id UNINDEXED, prefix='2 3')",
+        "CREATE TRIGGER search_document_ai AFTER INSERT ON search_document BEGIN "
+        "INSERT INTO search_fts (rowid, user_key, label, body, resource, row_id) "
+        "VALUES (new.id, 'u' || new.user_id, new.label, new.body, new.resource, new.row_id); END",
+        "CREATE TRIGGER search_document_ad AFTER DELETE ON search_document BEGIN "
+        "DELETE FROM search_fts WHERE rowid = old.id; END",
+        "CREATE TRIGGER search_document_au AFTER UPDATE ON search_document BEGIN "
+        "UPDATE search_fts SET user_key = 'u' || new.user_id, label = new.label, body = new.body, "
+        "resource = new.resource, row_id = new.row_id WHERE rowid = old.id; END",
+    ],
+}
+
+for dialect_name, statements in SEARCH_DDL.items():
+    for statement in statements:
+        db.event.listen(SearchDocument.__table__, 'after_create', db.DDL(statement).execute_if(dialect=dialect_name))
+db.event.listen(SearchDocument.__table__, 'before_drop', db.DDL('DROP TABLE IF EXISTS search_fts').execute_if(dialect='sqlite'))
+
+class ImportJob(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    resource = db.Column(db.String(20), nullable=False)
+    format = db.Column(db.String(10), nullable=False)
+    status = db.Column(db.String(20), default='queued')  # queued, running, completed, failed
+    bytes_total = db.Column(db.BigInteger, default=0)
+    bytes_read = db.Column(db.BigInteger, default=0)
+    rows_processed = db.Column(db.Integer, default=0)
+    rows_failed = db.Column(db.Integer, default=0)
+    errors = db.Column(db.Text)  # JSON list, capped at IMPORT_MAX_ERRORS
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+
+# Serializable columns per model, in response order
+CUSTOMER_FIELDS = ('id', 'name', 'email', 'phone', 'company', 'industry', 'status', 'external_id', 'created_at', 'updated_at')
+CONTACT_FIELDS = ('id', 'first_name', 'last_name', 'email', 'phone', 'position', 'customer_id', 'external_id', 'created_at', 'updated_at')
+DEAL_FIELDS = ('id', 'title', 'value', 'stage', 'probability', 'expected_close_date', 'customer_id', 'external_id', 'created_at', 'updated_at')
+ACTIVITY_FIELDS = ('id', 'type', 'subject', 'description', 'due_date', 'completed', 'customer_id', 'deal_id', 'external_id', 'created_at', 'updated_at')
+
+def serializer(fields):
+    # attrgetter resolves every column in one C-level call per object
+    getter = attrgetter(*fields)
+    return lambda obj: dict(zip(fields, getter(obj)))
+
+serialize_customer = serializer(CUSTOMER_FIELDS)
+serialize_contact = serializer(CONTACT_FIELDS)
+serialize_deal = serializer(DEAL_FIELDS)
+serialize_activity = serializer(ACTIVITY_FIELDS)
+
+TEMPORAL_FIELDS = frozenset(('due_date', 'expected_close_date', 'created_at', 'updated_at'))
+
+def serialize_rows(fields, rows):
+    # Rows come straight from column SELECTs; values are encoded by the JSON
+    # provider, and zip stops before any trailing cursor columns
+    items = [dict(zip(fields, row)) for row in rows]
+    if not orjson:
+        # The stdlib encoder's default() hook is slow per value; convert up front
+        temporal = [f for f in fields if f in TEMPORAL_FIELDS]
+        for item in items:
+            for f in temporal:
+                if item[f] is not None:
+                    item[f] = item[f].isoformat()
+    return items
+
+RESOURCES = {
+    'customers': (Customer, CUSTOMER_FIELDS),
+    'contacts': (Contact, CONTACT_FIELDS),
+    'deals': (Deal, DEAL_FIELDS),
+    'activities': (Activity, ACTIVITY_FIELDS),
+}
+
+def dialect_insert(model):
+    # INSERT ... ON CONFLICT is spelled the same in both dialects we run on
+    insert = postgresql_insert if db.engine.dialect.name == 'postgresql' else sqlite_insert
+    return insert(model)
+
+# Collection versions
+def bump_collection_version(user_id, model):
+    stmt = dialect_insert(CollectionVersion).values(user_id=user_id, resource=model.__tablename__, version=1)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=['user_id', 'resource'],
+        set_={'version': CollectionVersion.version + 1}
+    ))
+
+def collection_version(user_id, model):
+    return db.session.execute(
+        db.select(CollectionVersion.version).where(
+            CollectionVersion.user_id == user_id,
+            CollectionVersion.resource == model.__tablename__
+        )
+    ).scalar() or 0
+
+def collection_etag(user_id, model, version):
+    # The query string selects the page and columns, so it is part of the
+    # representation; the user id keeps a shared browser cache from ever
+    # revalidating one account's page for another
+    key = f'{user_id}:{model.__tablename__}:{version}:'.encode() + request.query_string
+    return hashlib.sha1(key).hexdigest()
+
+def record_tombstones(user_id, model, row_ids):
+    if row_ids:
+        db.session.execute(db.insert(Tombstone), [
+            {'resource': model.__tablename__, 'row_id': row_id, 'user_id': user_id} for row_id in row_ids
+        ])
+
+def record_tombstones_where(user_id, model, *criteria):
+    # Same as record_tombstones, for rows picked by criteria rather than
+    # listed: one INSERT ... SELECT however many rows match
+    db.session.execute(db.insert(Tombstone).from_select(
+        ['resource', 'row_id', 'user_id'],
+        db.select(db.literal(model.__tablename__), model.id, model.user_id).where(model.user_id == user_id, *criteria)
+    ))
+
+# Search documents
+SEARCH_SOURCES = {
+    Customer: (Customer.name, db.func.coalesce(Customer.company, '') + ' ' + db.func.coalesce(Customer.email, '')),
+    Contact: (Contact.first_name + ' ' + Contact.last_name, db.func.coalesce(Contact.email, '')),
+    Deal: (Deal.title, db.literal('')),
+}
+
+def sync_search_documents(user_id, model, ids):
+    # Rewrites the documents for ids from the current rows; deleted rows
+    # simply produce no replacement
+    if model not in SEARCH_SOURCES or not ids:
+        return
+    label, body = SEARCH_SOURCES[model]
+    db.session.execute(db.delete(SearchDocument).where(
+        SearchDocument.resource == model.__tablename__,
+        SearchDocument.row_id.in_(ids)
+    ))
+    db.session.execute(db.insert(SearchDocument).from_select(
+        ['resource', 'row_id', 'label', 'body', 'user_id'],
+        db.select(db.literal(model.__tablename__), model.id, label, body, model.user_id)
+        .where(model.user_id == user_id, model.id.in_(ids))
+    ))
+
+# Cascading deletes
+# The database removes a deleted customer's contacts, deals and activities
+# (ON DELETE CASCADE) and unlinks activities from a deleted deal (ON DELETE
+# SET NULL). What it cannot do is the app's own bookkeeping, so the helpers
+# below run it first as a few set-based statements over the rows about to
+# go: the cost no longer depends on how many children a customer has.
+def detach_deal_activities(user_id, deal_ids, excluded_customer_ids=()):
+    # Done here as well as by SET NULL so the change bumps updated_at and
+    # reaches sync clients and ETags. Activities of excluded customers are
+    # about to be deleted with them and are left alone.
+    now = datetime.utcnow()
+    for model in (Activity, ActivityArchive):
+        stmt = db.update(model).where(model.user_id == user_id, model.deal_id.in_(deal_ids))
+        if excluded_customer_ids:
+            stmt = stmt.where(db.or_(model.customer_id.is_(None), model.customer_id.not_in(excluded_customer_ids)))
+        result = db.session.execute(stmt.values(deal_id=None, updated_at=now).execution_options(synchronize_session=False))
+        if result.rowcount:
+            bump_collection_version(user_id, model)
+
+def cascade_customer_delete(user_id, customer_ids):
+    # Locks go deal rows, then summary rows, then collection versions, as in
+    # the deal routes, so concurrent deletes cannot deadlock on PostgreSQL
+    deals = db.select(Deal.id).where(Deal.user_id == user_id, Deal.customer_id.in_(customer_ids))
+    db.session.execute(deals.with_for_update())
+    for (_, stage), (count, total_value, weighted_value) in computed_deal_summary(user_id, Deal.customer_id.in_(customer_ids)).items():
+        add_deal_summary(user_id, stage, -count, -total_value, -weighted_value)
+    detach_deal_activities(user_id, deals, customer_ids)
+    for model in (Contact, Deal):
+        db.session.execute(db.delete(SearchDocument).where(
+            SearchDocument.resource == model.__tablename__,
+            SearchDocument.row_id.in_(db.select(model.id).where(model.user_id == user_id, model.customer_id.in_(customer_ids)))
+        ))
+    for model in (Contact, Deal, Activity):
+        record_tombstones_where(user_id, model, model.customer_id.in_(customer_ids))
+        bump_collection_version(user_id, model)
+    bump_collection_version(user_id, ActivityArchive)
+
+# Pagination
+DEFAULT_PAGE_LIMIT = int(os.getenv('DEFAULT_PAGE_LIMIT', 100))
+MAX_PAGE_LIMIT = int(os.getenv('MAX_PAGE_LIMIT', 500))
+
+def encode_cursor(updated_at, row_id):
+    raw = json.dumps([updated_at.isoformat(), row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+    updated_at, row_id = json.loads(raw)
+    return datetime.fromisoformat(updated_at), int(row_id)
+
+def json_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+def page_statement(model, fields, criteria, limit, after=None, order='updated_at'):
+    # Only the requested columns are selected; the cursor key rides along
+    key = getattr(model, order)
+    stmt = db.select(
+        *[getattr(model, f) for f in fields],
+        key.label('cursor_key'),
+        model.id.label('cursor_id')
+    ).where(*criteria).order_by(key, model.id).limit(limit + 1)
+    if after:
+        stmt = stmt.where(db.tuple_(key, model.id) > after)
+    return stmt
+
+def paginated_response(model, allowed_fields, *criteria, order='updated_at'):
+    # Keyset pagination over (order, id), by default (updated_at, id): each
+    # page is an index range scan starting after the cursor, so deep pages
+    # cost the same as the first.
+    fields = allowed_fields
+    if request.args.get('fields'):
+        fields = tuple(f for f in request.args['fields'].split(',') if f)
+        unknown = [f for f in fields if f not in allowed_fields]
+        if unknown:
+            return jsonify({'error': f"Unknown fields: {', '.join(unknown)}"}), 400
+
+    try:
+        limit = int(request.args.get('limit', DEFAULT_PAGE_LIMIT))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    limit = max(1, min(limit, MAX_PAGE_LIMIT))
+
+    after = None
+    if request.args.get('cursor'):
+        try:
+            after = decode_cursor(request.args['cursor'])
+        except (ValueError, TypeError):
+            return jsonify({'error': 'Invalid cursor'}), 400
+
+    # Answer revalidation from the version counter alone, without touching rows
+    user_id = get_jwt_identity()
+    etag = collection_etag(user_id, model, collection_version(user_id, model))
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        rows = db.session.execute(page_statement(model, fields, criteria, limit, after, order)).all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1].cursor_key, rows[-1].cursor_id)
+        response = jsonify({
+            'items': serialize_rows(fields, rows),
+            'next_cursor': next_cursor
+        })
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+# Read replicas
+# With DATABASE_REPLICA_URLS set, read-only routes may be served by a replica,
+# picked round-robin per request. Routes declare which collections they read;
+# on the request's first query the replica's collection versions for the user
+# are compared with the primary's, and the replica is used only if it has
+# every write the user has made to them. A GET right after the user's own
+# POST/PUT, on any worker, therefore reads from the primary until the replica
+# has caught up, and a lagging replica only loses the users it is behind for.
+# A replica that cannot be reached is skipped for REPLICA_RETRY_SECONDS.
+REPLICA_RETRY_SECONDS = int(os.getenv('REPLICA_RETRY_SECONDS', 30))
+REPLICA_READS = Counter('crm_replica_reads_total', 'Read-only requests by the database that served them', ['target', 'reason'])
+
+replica_counter = itertools.count()
+replica_down_until = {}  # bind key -> time.monotonic() until which it is skipped
+
+def allow_replica_reads(user_id, models):
+    g.db_read_user = user_id
+    g.db_read_models = models
+
+def read_only(*models):
+    # For read-only views behind jwt_required; models are what the view reads
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            allow_replica_reads(get_jwt_identity(), models)
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def request_replica():
+    if 'db_replica' not in g:
+        if 'db_read_models' not in g:
+            return None
+        g.db_replica = None
+        g.db_replica = choose_replica(g.db_read_user, g.db_read_models)
+    return g.db_replica
+
+def choose_replica(user_id, models):
+    keys = current_app.config.get('REPLICA_BINDS')
+    if not keys:
+        return None
+    stmt = db.select(CollectionVersion.resource, CollectionVersion.version).where(
+        CollectionVersion.user_id == user_id,
+        CollectionVersion.resource.in_([model.__tablename__ for model in models])
+    )
+    primary, lagging = None, False
+    start = next(replica_counter)
+    for offset in range(len(keys)):
+        key = keys[(start + offset) % len(keys)]
+        if replica_down_until.get(key, 0) > time.monotonic():
+            continue
+        if primary is None:
+            with db.engine.connect() as conn:
+                primary = conn.execute(stmt).all()
+        try:
+            with db.engines[key].connect() as conn:
+                replica = dict(conn.execute(stmt).all())
+        except SQLAlchemyError as e:
+            replica_down_until[key] = time.monotonic() + REPLICA_RETRY_SECONDS
+            logger.warning('Replica %s unavailable for %ss: %s', key, REPLICA_RETRY_SECONDS, e)
+            continue
+        if all(replica.get(resource, 0) >= version for resource, version in primary):
+            REPLICA_READS.labels('replica', 'current').inc()
+            return key
+        lagging = True
+    REPLICA_READS.labels('primary', 'lagging' if lagging else 'unavailable').inc()
+    return None
+
+def end_replica_reads():
+    for name in ('db_replica', 'db_read_models', 'db_read_user'):
+        g.pop(name, None)
+
+# Password hashing
+# Password hashes are slow on purpose. They run in a small pool of
+# processes, started on first use in each server process (so after gunicorn
+# forks) and niced so the CPU goes to serving requests first. At most
+# PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE request threads wait on the
+# pool; further logins get an immediate 503, so a burst of sign-ins cannot
+# tie up the threads every other route needs. PASSWORD_HASH_WORKERS=0
+# hashes inline.
+PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 1))
+PASSWORD_HASH_QUEUE = int(os.getenv('PASSWORD_HASH_QUEUE', 1))
+PASSWORD_HASH_NICE = int(os.getenv('PASSWORD_HASH_NICE', 10))
+PASSWORD_HASH_RETRY_AFTER = int(os.getenv('PASSWORD_HASH_RETRY_AFTER', 1))
+
+password_slots = threading.BoundedSemaphore(max(PASSWORD_HASH_WORKERS, 1) + PASSWORD_HASH_QUEUE)
+password_pool_lock = threading.Lock()
+password_pool = None
+password_pool_pid = None
+
+class PasswordHashBusy(Exception):
+    pass
+
+def hash_method_key(method):
+    # Werkzeug writes omitted parameters out in full in the hash it returns
+    name, *params = method.split(':')
+    defaults = {'scrypt': ['32768', '8', '1'], 'pbkdf2': ['sha256', str(DEFAULT_PBKDF2_ITERATIONS)]}.get(name)
+    if defaults is None:
+        return method
+    return ':'.join([name] + params + defaults[len(params):])
+
+def password_executor():
+    global password_pool, password_pool_pid
+    with password_pool_lock:
+        if password_pool is None or password_pool_pid != os.getpid():
+            # Spawned, not forked: forking a process that runs request
+            # threads can copy locks other threads were holding
+            password_pool = ProcessPoolExecutor(PASSWORD_HASH_WORKERS, mp_context=multiprocessing.get_context('spawn'),
+                                                initializer=os.nice, initargs=(PASSWORD_HASH_NICE,))
+            password_pool_pid = os.getpid()
+        return password_pool
+
+def run_password_job(fn, *args):
+    global password_pool
+    if PASSWORD_HASH_WORKERS <= 0:
+        return fn(*args)
+    if not password_slots.acquire(blocking=False):
+        raise PasswordHashBusy()
+    try:
+        return password_executor().submit(fn, *args).result()
+    except BrokenProcessPool:
+        # A worker died; start a fresh pool on the next call
+        with password_pool_lock:
+            password_pool = None
+        raise
+    finally:
+        password_slots.release()
+
+def hash_password(password):
+    return run_password_job(generate_password_hash, password, PASSWORD_HASH_METHOD)
+
+def verify_password(password_hash, password):
+    return run_password_job(check_password_hash, password_hash, password)
+
+def password_needs_rehash(password_hash):
+    return hash_method_key(password_hash.split('$', 1)[0]) != hash_method_key(PASSWORD_HASH_METHOD)
+
+def password_busy_response():
+    response = jsonify({'error': 'Too many sign-ins in progress, please retry'})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(PASSWORD_HASH_RETRY_AFTER)
+    return response
+
 # Authentication Routes
-@app.route('/api/auth/register', methods=['POST'])
+@api.route('/api/auth/register', methods=['POST'])
 def register():
     data = request.get_json()
     
@@ -91,10 +770,15 @@ def register():
     if User.query.filter_by(email=data['email']).first():
         return jsonify({'error': 'Email already exists'}), 400
     
+    try:
+        password_hash = hash_password(data['password'])
+    except PasswordHashBusy:
+        return password_busy_response()
+    
     user = User(
         username=data['username'],
         email=data['email'],
-        password_hash=generate_password_hash(data['password'])
+        password_hash=password_hash
     )
     
     db.session.add(user)
@@ -110,12 +794,25 @@ def register():
         }
     }), 201
 
-@app.route('/api/auth/login', methods=['POST'])
+@api.route('/api/auth/login', methods=['POST'])
 def login():
     data = request.get_json()
     user = User.query.filter_by(username=data['username']).first()
     
-    if user and check_password_hash(user.password_hash, data['password']):
+    try:
+        valid = user is not None and verify_password(user.password_hash, data['password'])
+    except PasswordHashBusy:
+        return password_busy_response()
+    
+    if valid:
+        if password_needs_rehash(user.password_hash):
+            # The configured cost changed; upgrade while the password is at
+            # hand. If the pool is busy, the next login does it.
+            try:
+                user.password_hash = hash_password(data['password'])
+                db.session.commit()
+            except PasswordHashBusy:
+                pass
         access_token = create_access_token(identity=user.id)
         return jsonify({
             'access_token': access_token,
@@ -129,24 +826,14 @@ def login():
     return jsonify({'error': 'Invalid credentials'}), 401
 
 # Customer Routes
-@app.route('/api/customers', methods=['GET'])
+@api.route('/api/customers', methods=['GET'])
 @jwt_required()
+@read_only(Customer)
 def get_customers():
     user_id = get_jwt_identity()
-    customers = Customer.query.filter_by(user_id=user_id).all()
-    return jsonify([{
-        'id': c.id,
-        'name': c.name,
-        'email': c.email,
-        'phone': c.phone,
-        'company': c.company,
-        'industry': c.industry,
-        'status': c.status,
-        'created_at': c.created_at.isoformat(),
-        'updated_at': c.updated_at.isoformat()
-    } for c in customers]), 200
-
-@app.route('/api/customers', methods=['POST'])
+    return paginated_response(Customer, CUSTOMER_FIELDS, Customer.user_id == user_id)
+
+@api.route('/api/customers', methods=['POST'])
 @jwt_required()
 def create_customer():
     user_id = get_jwt_identity()
@@ -163,21 +850,14 @@ def create_customer():
     )
     
     db.session.add(customer)
+    db.session.flush()
+    sync_search_documents(user_id, Customer, [customer.id])
+    bump_collection_version(user_id, Customer)
     db.session.commit()
     
-    return jsonify({
-        'id': customer.id,
-        'name': customer.name,
-        'email': customer.email,
-        'phone': customer.phone,
-        'company': customer.company,
-        'industry': customer.industry,
-        'status': customer.status,
-        'created_at': customer.created_at.isoformat(),
-        'updated_at': customer.updated_at.isoformat()
-    }), 201
+    return jsonify(serialize_customer(customer)), 201
 
-@app.route('/api/customers/<int:customer_id>', methods=['PUT'])
+@api.route('/api/customers/<int:customer_id>', methods=['PUT'])
 @jwt_required()
 def update_customer(customer_id):
     user_id = get_jwt_identity()
@@ -194,22 +874,14 @@ def update_customer(customer_id):
     customer.industry = data.get('industry', customer.industry)
     customer.status = data.get('status', customer.status)
     customer.updated_at = datetime.utcnow()
+    sync_search_documents(user_id, Customer, [customer.id])
+    bump_collection_version(user_id, Customer)
     
     db.session.commit()
     
-    return jsonify({
-        'id': customer.id,
-        'name': customer.name,
-        'email': customer.email,
-        'phone': customer.phone,
-        'company': customer.company,
-        'industry': customer.industry,
-        'status': customer.status,
-        'created_at': customer.created_at.isoformat(),
-        'updated_at': customer.updated_at.isoformat()
-    }), 200
+    return jsonify(serialize_customer(customer)), 200
 
-@app.route('/api/customers/<int:customer_id>', methods=['DELETE'])
+@api.route('/api/customers/<int:customer_id>', methods=['DELETE'])
 @jwt_required()
 def delete_customer(customer_id):
     user_id = get_jwt_identity()
@@ -218,36 +890,111 @@ def delete_customer(customer_id):
     if not customer:
         return jsonify({'error': 'Customer not found'}), 404
     
+    cascade_customer_delete(user_id, [customer.id])
     db.session.delete(customer)
+    sync_search_documents(user_id, Customer, [customer.id])
+    record_tombstones(user_id, Customer, [customer.id])
+    bump_collection_version(user_id, Customer)
     db.session.commit()
     
     return jsonify({'message': 'Customer deleted'}), 200
 
+# Customer overview
+# Everything a profile page needs in one round trip and a fixed five
+# queries: each embedded list is capped and newest-first, so the response
+# does not grow with the customer's history.
+OVERVIEW_LIMIT = int(os.getenv('OVERVIEW_LIMIT', 10))
+CLOSED_DEAL_STAGES = ('closed-won', 'closed-lost')
+
+def embedded_rows(stmt, limit, serialize):
+    rows = db.session.scalars(stmt.limit(limit + 1)).all()
+    return {'items': [serialize(row) for row in rows[:limit]], 'has_more': len(rows) > limit}
+
+def serialize_overview_activity(activity):
+    return dict(serialize_activity(activity), deal_title=activity.deal.title if activity.deal else None)
+
+def customer_deal_totals(user_id, customer_id):
+    by_stage = db.session.execute(
+        db.select(
+            Deal.stage,
+            db.func.count(Deal.id).label('count'),
+            db.func.sum(Deal.value).label('value'),
+            db.func.sum(Deal.value * db.func.coalesce(Deal.probability, 0) / 100).label('weighted_value')
+        ).where(Deal.user_id == user_id, Deal.customer_id == customer_id)
+        .group_by(Deal.stage).order_by(Deal.stage)
+    ).all()
+    return {
+        'count': sum(s.count for s in by_stage),
+        'value': float(sum(s.value for s in by_stage)),
+        'weighted_value': float(sum(s.weighted_value for s in by_stage)),
+        'by_stage': [{
+            'stage': s.stage,
+            'count': s.count,
+            'value': float(s.value),
+            'weighted_value': float(s.weighted_value)
+        } for s in by_stage]
+    }
+
+@api.route('/api/customers/<int:customer_id>/overview', methods=['GET'])
+@jwt_required()
+@read_only(Customer, Contact, Deal, Activity)
+def customer_overview(customer_id):
+    user_id = get_jwt_identity()
+    limits = {}
+    for name in ('contacts', 'deals', 'activities'):
+        try:
+            limits[name] = max(1, min(int(request.args.get(f'{name}_limit', OVERVIEW_LIMIT)), MAX_PAGE_LIMIT))
+        except ValueError:
+            return jsonify({'error': f'{name}_limit must be an integer'}), 400
+
+    customer = Customer.query.filter_by(id=customer_id, user_id=user_id).first()
+    if not customer:
+        return jsonify({'error': 'Customer not found'}), 404
+
+    contacts = embedded_rows(
+        db.select(Contact).where(Contact.user_id == user_id, db.with_parent(customer, Customer.contacts))
+        .order_by(Contact.updated_at.desc(), Contact.id.desc()),
+        limits['contacts'], serialize_contact
+    )
+    open_deals = embedded_rows(
+        db.select(Deal).where(
+            Deal.user_id == user_id,
+            db.with_parent(customer, Customer.deals),
+            db.or_(Deal.stage.is_(None), Deal.stage.notin_(CLOSED_DEAL_STAGES))
+        ).order_by(Deal.expected_close_date.is_(None), Deal.expected_close_date, Deal.id),
+        limits['deals'], serialize_deal
+    )
+    # The deal title rides along in the same query instead of one load per activity
+    recent_activities = embedded_rows(
+        db.select(Activity).where(Activity.user_id == user_id, db.with_parent(customer, Customer.activities))
+        .options(db.joinedload(Activity.deal).load_only(Deal.title))
+        .order_by(Activity.updated_at.desc(), Activity.id.desc()),
+        limits['activities'], serialize_overview_activity
+    )
+
+    return jsonify({
+        'customer': serialize_customer(customer),
+        'contacts': contacts,
+        'open_deals': open_deals,
+        'recent_activities': recent_activities,
+        'deal_totals': customer_deal_totals(user_id, customer_id)
+    }), 200
+
 # Contact Routes
-@app.route('/api/contacts', methods=['GET'])
+@api.route('/api/contacts', methods=['GET'])
 @jwt_required()
+@read_only(Contact)
 def get_contacts():
     user_id = get_jwt_identity()
     customer_id = request.args.get('customer_id')
     
-    query = Contact.query.filter_by(user_id=user_id)
+    criteria = [Contact.user_id == user_id]
     if customer_id:
-        query = query.filter_by(customer_id=customer_id)
-    
-    contacts = query.all()
-    return jsonify([{
-        'id': c.id,
-        'first_name': c.first_name,
-        'last_name': c.last_name,
-        'email': c.email,
-        'phone': c.phone,
-        'position': c.position,
-        'customer_id': c.customer_id,
-        'created_at': c.created_at.isoformat(),
-        'updated_at': c.updated_at.isoformat()
-    } for c in contacts]), 200
-
-@app.route('/api/contacts', methods=['POST'])
+        criteria.append(Contact.customer_id == customer_id)
+    
+    return paginated_response(Contact, CONTACT_FIELDS, *criteria)
+
+@api.route('/api/contacts', methods=['POST'])
 @jwt_required()
 def create_contact():
     user_id = get_jwt_identity()
@@ -264,21 +1011,14 @@ def create_contact():
     )
     
     db.session.add(contact)
+    db.session.flush()
+    sync_search_documents(user_id, Contact, [contact.id])
+    bump_collection_version(user_id, Contact)
     db.session.commit()
     
-    return jsonify({
-        'id': contact.id,
-        'first_name': contact.first_name,
-        'last_name': contact.last_name,
-        'email': contact.email,
-        'phone': contact.phone,
-        'position': contact.position,
-        'customer_id': contact.customer_id,
-        'created_at': contact.created_at.isoformat(),
-        'updated_at': contact.updated_at.isoformat()
-    }), 201
+    return jsonify(serialize_contact(contact)), 201
 
-@app.route('/api/contacts/<int:contact_id>', methods=['PUT'])
+@api.route('/api/contacts/<int:contact_id>', methods=['PUT'])
 @jwt_required()
 def update_contact(contact_id):
     user_id = get_jwt_identity()
@@ -294,22 +1034,14 @@ def update_contact(contact_id):
     contact.phone = data.get('phone', contact.phone)
     contact.position = data.get('position', contact.position)
     contact.updated_at = datetime.utcnow()
+    sync_search_documents(user_id, Contact, [contact.id])
+    bump_collection_version(user_id, Contact)
     
     db.session.commit()
     
-    return jsonify({
-        'id': contact.id,
-        'first_name': contact.first_name,
-        'last_name': contact.last_name,
-        'email': contact.email,
-        'phone': contact.phone,
-        'position': contact.position,
-        'customer_id': contact.customer_id,
-        'created_at': contact.created_at.isoformat(),
-        'updated_at': contact.updated_at.isoformat()
-    }), 200
+    return jsonify(serialize_contact(contact)), 200
 
-@app.route('/api/contacts/<int:contact_id>', methods=['DELETE'])
+@api.route('/api/contacts/<int:contact_id>', methods=['DELETE'])
 @jwt_required()
 def delete_contact(contact_id):
     user_id = get_jwt_identity()
@@ -319,33 +1051,164 @@ def delete_contact(contact_id):
         return jsonify({'error': 'Contact not found'}), 404
     
     db.session.delete(contact)
+    sync_search_documents(user_id, Contact, [contact.id])
+    record_tombstones(user_id, Contact, [contact.id])
+    bump_collection_version(user_id, Contact)
     db.session.commit()
     
     return jsonify({'message': 'Contact deleted'}), 200
 
+# Deal stage summary
+def deal_summary_key(deal):
+    return (deal.stage or '', float(deal.value or 0), deal.probability or 0)
+
+def deal_row_key(row):
+    return (row.get('stage') or '', float(row.get('value') or 0), row.get('probability') or 0)
+
+def apply_deal_summary_delta(user_id, key, sign):
+    stage, value, probability = key
+    add_deal_summary(user_id, stage, sign, sign * value, sign * value * probability / 100)
+
+def apply_deal_summary_deltas(user_id, keys, sign):
+    # Collapse many deals into one upsert per stage
+    totals = {}
+    for stage, value, probability in keys:
+        count, total_value, weighted_value = totals.get(stage, (0, 0.0, 0.0))
+        totals[stage] = (count + sign, total_value + sign * value, weighted_value + sign * value * probability / 100)
+    for stage, (count, total_value, weighted_value) in totals.items():
+        add_deal_summary(user_id, stage, count, total_value, weighted_value)
+
+def add_deal_summary(user_id, stage, count, total_value, weighted_value):
+    # Atomic upsert so concurrent writers never lose each other's increments
+    stmt = dialect_insert(DealStageSummary).values(
+        user_id=user_id,
+        stage=stage,
+        count=count,
+        total_value=total_value,
+        weighted_value=weighted_value
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['user_id', 'stage'],
+        set_={
+            'count': DealStageSummary.count + stmt.excluded.count,
+            'total_value': DealStageSummary.total_value + stmt.excluded.total_value,
+            'weighted_value': DealStageSummary.weighted_value + stmt.excluded.weighted_value
+        }
+    )
+    db.session.execute(stmt)
+
+def computed_deal_summary(user_id=None, *criteria):
+    stage = db.func.coalesce(Deal.stage, '')
+    stmt = db.select(
+        Deal.user_id,
+        stage,
+        db.func.count(Deal.id),
+        db.func.coalesce(db.func.sum(Deal.value), 0),
+        db.func.coalesce(db.func.sum(Deal.value * db.func.coalesce(Deal.probability, 0) / 100.0), 0)
+    ).where(*criteria).group_by(Deal.user_id, stage)
+    if user_id is not None:
+        stmt = stmt.where(Deal.user_id == user_id)
+    rows = db.session.execute(stmt).all()
+    return {(r[0], r[1]): (r[2], float(r[3]), float(r[4])) for r in rows}
+
+def stored_deal_summary():
+    rows = db.session.execute(db.select(
+        DealStageSummary.user_id,
+        DealStageSummary.stage,
+        DealStageSummary.count,
+        DealStageSummary.total_value,
+        DealStageSummary.weighted_value
+    ).where(DealStageSummary.count != 0)).all()
+    return {(r[0], r[1]): (r[2], r[3], r[4]) for r in rows}
+
+def deal_summary_drift():
+    computed = computed_deal_summary()
+    stored = stored_deal_summary()
+    drift = []
+    for key in sorted(set(computed) | set(stored), key=lambda k: (k[0], k[1])):
+        expected = computed.get(key, (0, 0.0, 0.0))
+        actual = stored.get(key, (0, 0.0, 0.0))
+        # The stored totals are sums of many float deltas, so large ones
+        # carry rounding error proportional to their size
+        if expected[0] != actual[0] or not all(
+            math.isclose(e, a, rel_tol=1e-9, abs_tol=1e-6) for e, a in zip(expected[1:], actual[1:])
+        ):
+            drift.append((key, expected, actual))
+    return drift
+
+def replace_deal_summary(user_id=None):
+    stmt = db.delete(DealStageSummary)
+    if user_id is not None:
+        stmt = stmt.where(DealStageSummary.user_id == user_id)
+    db.session.execute(stmt)
+    for (row_user_id, stage), (count, total_value, weighted_value) in computed_deal_summary(user_id).items():
+        db.session.add(DealStageSummary(
+            user_id=row_user_id,
+            stage=stage,
+            count=count,
+            total_value=total_value,
+            weighted_value=weighted_value
+        ))
+
+deal_summary_cli = AppGroup('deal-summary', help='Maintain the deal_stage_summary table.')
+
+@deal_summary_cli.command('verify')
+def verify_deal_summary():
+    """Report rows where the summary disagrees with the deal table."""
+    drift = deal_summary_drift()
+    for (user_id, stage), expected, actual in drift:
+        print(f'user={user_id} stage={stage!r}: expected {expected}, stored {actual}')
+    if drift:
+        raise SystemExit(f'{len(drift)} summary rows drifted')
+    print('deal_stage_summary is consistent')
+
+@deal_summary_cli.command('rebuild')
+def rebuild_deal_summary():
+    """Recompute the summary from scratch, reporting any drift it fixes."""
+    drift = deal_summary_drift()
+    for (user_id, stage), expected, actual in drift:
+        print(f'user={user_id} stage={stage!r}: stored {actual}, rebuilt as {expected}')
+    replace_deal_summary()
+    # Retires dashboards cached from the drifted rows
+    db.session.execute(db.update(CollectionVersion).where(CollectionVersion.resource == Deal.__tablename__)
+                       .values(version=CollectionVersion.version + 1))
+    db.session.commit()
+    print(f'Rebuilt deal_stage_summary ({len(drift)} rows drifted)')
+
+api.cli.add_command(deal_summary_cli)
+
 # Deal Routes
-@app.route('/api/deals', methods=['GET'])
+def parse_deal_numbers(data):
+    # The same parsers as the bulk path, so summary deltas only see numbers
+    for field, parse in (('value', parse_number), ('probability', parse_probability)):
+        if field in data:
+            try:
+                data[field] = parse(data[field])
+            except (ValueError, TypeError):
+                raise ValueError(f'Invalid {field}: {data[field]!r}')
+
+@api.route('/api/deals', methods=['GET'])
 @jwt_required()
+@read_only(Deal)
 def get_deals():
     user_id = get_jwt_identity()
-    deals = Deal.query.filter_by(user_id=user_id).all()
-    return jsonify([{
-        'id': d.id,
-        'title': d.title,
-        'value': d.value,
-        'stage': d.stage,
-        'probability': d.probability,
-        'expected_close_date': d.expected_close_date.isoformat() if d.expected_close_date else None,
-        'customer_id': d.customer_id,
-        'created_at': d.created_at.isoformat(),
-        'updated_at': d.updated_at.isoformat()
-    } for d in deals]), 200
-
-@app.route('/api/deals', methods=['POST'])
+    customer_id = request.args.get('customer_id')
+    
+    criteria = [Deal.user_id == user_id]
+    if customer_id:
+        criteria.append(Deal.customer_id == customer_id)
+    
+    return paginated_response(Deal, DEAL_FIELDS, *criteria)
+
+@api.route('/api/deals', methods=['POST'])
 @jwt_required()
 def create_deal():
     user_id = get_jwt_identity()
     data = request.get_json()
+    try:
+        parse_deal_numbers(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
     deal = Deal(
         title=data['title'],
@@ -358,30 +1221,31 @@ def create_deal():
     )
     
     db.session.add(deal)
+    db.session.flush()
+    sync_search_documents(user_id, Deal, [deal.id])
+    apply_deal_summary_delta(user_id, deal_summary_key(deal), 1)
+    bump_collection_version(user_id, Deal)
     db.session.commit()
     
-    return jsonify({
-        'id': deal.id,
-        'title': deal.title,
-        'value': deal.value,
-        'stage': deal.stage,
-        'probability': deal.probability,
-        'expected_close_date': deal.expected_close_date.isoformat() if deal.expected_close_date else None,
-        'customer_id': deal.customer_id,
-        'created_at': deal.created_at.isoformat(),
-        'updated_at': deal.updated_at.isoformat()
-    }), 201
+    return jsonify(serialize_deal(deal)), 201
 
-@app.route('/api/deals/<int:deal_id>', methods=['PUT'])
+@api.route('/api/deals/<int:deal_id>', methods=['PUT'])
 @jwt_required()
 def update_deal(deal_id):
     user_id = get_jwt_identity()
-    deal = Deal.query.filter_by(id=deal_id, user_id=user_id).first()
+    # Locked until commit, so concurrent writes cannot both apply a summary
+    # delta computed from the same old values
+    deal = Deal.query.filter_by(id=deal_id, user_id=user_id).with_for_update().first()
     
     if not deal:
         return jsonify({'error': 'Deal not found'}), 404
     
     data = request.get_json()
+    try:
+        parse_deal_numbers(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    before = deal_summary_key(deal)
     deal.title = data.get('title', deal.title)
     deal.value = data.get('value', deal.value)
     deal.stage = data.get('stage', deal.stage)
@@ -389,64 +1253,84 @@ def update_deal(deal_id):
     if data.get('expected_close_date'):
         deal.expected_close_date = datetime.strptime(data['expected_close_date'], '%Y-%m-%d').date()
     deal.updated_at = datetime.utcnow()
+    after = deal_summary_key(deal)
+    if after != before:
+        apply_deal_summary_delta(user_id, before, -1)
+        apply_deal_summary_delta(user_id, after, 1)
+    sync_search_documents(user_id, Deal, [deal.id])
+    bump_collection_version(user_id, Deal)
     
     db.session.commit()
     
-    return jsonify({
-        'id': deal.id,
-        'title': deal.title,
-        'value': deal.value,
-        'stage': deal.stage,
-        'probability': deal.probability,
-        'expected_close_date': deal.expected_close_date.isoformat() if deal.expected_close_date else None,
-        'customer_id': deal.customer_id,
-        'created_at': deal.created_at.isoformat(),
-        'updated_at': deal.updated_at.isoformat()
-    }), 200
+    return jsonify(serialize_deal(deal)), 200
 
-@app.route('/api/deals/<int:deal_id>', methods=['DELETE'])
+@api.route('/api/deals/<int:deal_id>', methods=['DELETE'])
 @jwt_required()
 def delete_deal(deal_id):
     user_id = get_jwt_identity()
-    deal = Deal.query.filter_by(id=deal_id, user_id=user_id).first()
+    deal = Deal.query.filter_by(id=deal_id, user_id=user_id).with_for_update().first()
     
     if not deal:
         return jsonify({'error': 'Deal not found'}), 404
     
-    db.session.delete(deal)
+    # Summary rows before activity versions, the order every deal and
+    # customer delete takes its locks in
+    apply_deal_summary_delta(user_id, deal_summary_key(deal), -1)
+    detach_deal_activities(user_id, [deal.id])
+    # Where row locks are not available (SQLite), a concurrent delete can
+    # still get here; only the request that removed the row keeps its
+    # bookkeeping
+    deleted = db.session.execute(db.delete(Deal).where(Deal.id == deal.id, Deal.user_id == user_id)).rowcount
+    if deleted != 1:
+        db.session.rollback()
+        return jsonify({'error': 'Deal not found'}), 404
+    sync_search_documents(user_id, Deal, [deal.id])
+    record_tombstones(user_id, Deal, [deal.id])
+    bump_collection_version(user_id, Deal)
     db.session.commit()
     
     return jsonify({'message': 'Deal deleted'}), 200
 
 # Activity Routes
-@app.route('/api/activities', methods=['GET'])
+@api.route('/api/activities', methods=['GET'])
 @jwt_required()
+@read_only(Activity)
 def get_activities():
     user_id = get_jwt_identity()
     customer_id = request.args.get('customer_id')
     deal_id = request.args.get('deal_id')
     
-    query = Activity.query.filter_by(user_id=user_id)
+    criteria = [Activity.user_id == user_id]
     if customer_id:
-        query = query.filter_by(customer_id=customer_id)
+        criteria.append(Activity.customer_id == customer_id)
     if deal_id:
-        query = query.filter_by(deal_id=deal_id)
-    
-    activities = query.all()
-    return jsonify([{
-        'id': a.id,
-        'type': a.type,
-        'subject': a.subject,
-        'description': a.description,
-        'due_date': a.due_date.isoformat() if a.due_date else None,
-        'completed': a.completed,
-        'customer_id': a.customer_id,
-        'deal_id': a.deal_id,
-        'created_at': a.created_at.isoformat(),
-        'updated_at': a.updated_at.isoformat()
-    } for a in activities]), 200
-
-@app.route('/api/activities', methods=['POST'])
+        criteria.append(Activity.deal_id == deal_id)
+    
+    return paginated_response(Activity, ACTIVITY_FIELDS, *criteria)
+
+@api.route('/api/activities/agenda', methods=['GET'])
+@jwt_required()
+@read_only(Activity)
+def get_agenda():
+    # Activities due in [from, to), soonest first, open ones unless
+    # completed=true: one range of ix_activity_user_completed_due per page
+    user_id = get_jwt_identity()
+    try:
+        start = parse_datetime(request.args.get('from'))
+        end = parse_datetime(request.args.get('to'))
+    except ValueError:
+        return jsonify({'error': 'from and to must be ISO 8601 datetimes'}), 400
+    completed = request.args.get('completed', 'false').lower() in ('1', 'true', 'yes')
+    
+    criteria = [Activity.user_id == user_id, Activity.completed == completed, Activity.due_date.isnot(None)]
+    if start:
+        criteria.append(Activity.due_date >= start)
+    if end:
+        criteria.append(Activity.due_date < end)
+    
+    return paginated_response(Activity, ACTIVITY_FIELDS, *criteria, order='due_date')
+
+@api.route('/api/activities', methods=['POST'])
 @jwt_required()
 def create_activity():
     user_id = get_jwt_identity()
@@ -456,7 +1340,7 @@ def create_activity():
         type=data['type'],
         subject=data['subject'],
         description=data.get('description'),
-        due_date=datetime.fromisoformat(data['due_date'].replace('Z', '+00:00')) if data.get('due_date') else None,
+        due_date=parse_datetime(data.get('due_date')),
         completed=data.get('completed', False),
         customer_id=data.get('customer_id'),
         deal_id=data.get('deal_id'),
@@ -464,22 +1348,13 @@ def create_activity():
     )
     
     db.session.add(activity)
+    bump_collection_version(user_id, Activity)
     db.session.commit()
+    schedule_reminders([(activity.id, user_id, activity.due_date, activity.completed)])
     
-    return jsonify({
-        'id': activity.id,
-        'type': activity.type,
-        'subject': activity.subject,
-        'description': activity.description,
-        'due_date': activity.due_date.isoformat() if activity.due_date else None,
-        'completed': activity.completed,
-        'customer_id': activity.customer_id,
-        'deal_id': activity.deal_id,
-        'created_at': activity.created_at.isoformat(),
-        'updated_at': activity.updated_at.isoformat()
-    }), 201
+    return jsonify(serialize_activity(activity)), 201
 
-@app.route('/api/activities/<int:activity_id>', methods=['PUT'])
+@api.route('/api/activities/<int:activity_id>', methods=['PUT'])
 @jwt_required()
 def update_activity(activity_id):
     user_id = get_jwt_identity()
@@ -493,26 +1368,17 @@ def update_activity(activity_id):
     activity.subject = data.get('subject', activity.subject)
     activity.description = data.get('description', activity.description)
     if data.get('due_date'):
-        activity.due_date = datetime.fromisoformat(data['due_date'].replace('Z', '+00:00'))
+        activity.due_date = parse_datetime(data['due_date'])
     activity.completed = data.get('completed', activity.completed)
     activity.updated_at = datetime.utcnow()
+    bump_collection_version(user_id, Activity)
     
     db.session.commit()
+    schedule_reminders([(activity.id, user_id, activity.due_date, activity.completed)])
     
-    return jsonify({
-        'id': activity.id,
-        'type': activity.type,
-        'subject': activity.subject,
-        'description': activity.description,
-        'due_date': activity.due_date.isoformat() if activity.due_date else None,
-        'completed': activity.completed,
-        'customer_id': activity.customer_id,
-        'deal_id': activity.deal_id,
-        'created_at': activity.created_at.isoformat(),
-        'updated_at': activity.updated_at.isoformat()
-    }), 200
+    return jsonify(serialize_activity(activity)), 200
 
-@app.route('/api/activities/<int:activity_id>', methods=['DELETE'])
+@api.route('/api/activities/<int:activity_id>', methods=['DELETE'])
 @jwt_required()
 def delete_activity(activity_id):
     user_id = get_jwt_identity()
@@ -522,60 +1388,1532 @@ def delete_activity(activity_id):
         return jsonify({'error': 'Activity not found'}), 404
     
     db.session.delete(activity)
+    record_tombstones(user_id, Activity, [activity.id])
+    bump_collection_version(user_id, Activity)
     db.session.commit()
     
     return jsonify({'message': 'Activity deleted'}), 200
 
+# Activity archive
+# Completed activities untouched for ACTIVITY_ARCHIVE_DAYS move to
+# activity_archive in batches, each its own short transaction, so the hot
+# table and its indexes stay small without one long lock. Sync clients see
+# archived rows as deleted; the archive stays readable on its own endpoint.
+ACTIVITY_ARCHIVE_DAYS = int(os.getenv('ACTIVITY_ARCHIVE_DAYS', 365))
+ARCHIVE_BATCH_SIZE = int(os.getenv('ARCHIVE_BATCH_SIZE', 1000))
+ARCHIVE_COLUMNS = ('id', 'type', 'subject', 'description', 'due_date', 'completed', 'customer_id', 'deal_id',
+                   'created_at', 'updated_at', 'external_id', 'user_id')
+
+def archive_activities(user_id, cutoff, batch_size):
+    archived = 0
+    while True:
+        ids = db.session.execute(
+            db.select(Activity.id).where(
+                Activity.user_id == user_id,
+                Activity.updated_at < cutoff,
+                Activity.completed.is_(True)
+            ).order_by(Activity.updated_at, Activity.id).limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            return archived
+        db.session.execute(db.insert(ActivityArchive).from_select(
+            ARCHIVE_COLUMNS,
+            db.select(*[getattr(Activity, c) for c in ARCHIVE_COLUMNS]).where(Activity.id.in_(ids))
+        ))
+        db.session.execute(db.delete(Activity).where(Activity.id.in_(ids)))
+        record_tombstones(user_id, Activity, ids)
+        bump_collection_version(user_id, Activity)
+        bump_collection_version(user_id, ActivityArchive)
+        db.session.commit()
+        archived += len(ids)
+
+@api.route('/api/activities/archive', methods=['GET'])
+@jwt_required()
+@read_only(ActivityArchive)
+def get_archived_activities():
+    user_id = get_jwt_identity()
+    return paginated_response(ActivityArchive, ACTIVITY_FIELDS, ActivityArchive.user_id == user_id)
+
+@api.route('/api/activities/archive', methods=['POST'])
+@jwt_required()
+def archive_user_activities():
+    user_id = get_jwt_identity()
+    data = request.get_json(silent=True) or {}
+    try:
+        cutoff = parse_datetime(data['before']) if data.get('before') else datetime.utcnow() - timedelta(days=ACTIVITY_ARCHIVE_DAYS)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'before must be an ISO 8601 datetime'}), 400
+    
+    archived = archive_activities(user_id, cutoff, ARCHIVE_BATCH_SIZE)
+    
+    return jsonify({'archived': archived, 'before': cutoff}), 200
+
+@api.cli.command('archive-activities')
+def archive_activities_command():
+    """Move completed activities older than ACTIVITY_ARCHIVE_DAYS to the archive."""
+    cutoff = datetime.utcnow() - timedelta(days=ACTIVITY_ARCHIVE_DAYS)
+    user_ids = db.session.execute(db.select(User.id).order_by(User.id)).scalars().all()
+    archived = sum(archive_activities(user_id, cutoff, ARCHIVE_BATCH_SIZE) for user_id in user_ids)
+    print(f'Archived {archived} activities')
+
+# Activity reminders
+# Each server process keeps a min-heap of the reminder and overdue times
+# falling in a short window ahead: the loop sleeps until the earliest one,
+# and every REMINDER_REFRESH_SECONDS loads only the activities that became
+# due inside the window since (ix_activity_completed_due). The write routes
+# push their changes straight into the heap; entries for activities whose
+# due date moved are skipped when they surface, and those that still look
+# current are checked against the database before an event is written. Cost
+# follows the number of activities coming due, not the size of the table.
+REMINDER_SCHEDULER = os.getenv('REMINDER_SCHEDULER', 'true').lower() in ('1', 'true', 'yes')
+REMINDER_LEAD_MINUTES = int(os.getenv('REMINDER_LEAD_MINUTES', 15))
+REMINDER_REFRESH_SECONDS = int(os.getenv('REMINDER_REFRESH_SECONDS', 60))
+REMINDER_CATCH_UP_MINUTES = int(os.getenv('REMINDER_CATCH_UP_MINUTES', 60))
+REMINDER_PAGE_LIMIT = int(os.getenv('REMINDER_PAGE_LIMIT', 100))
+REMINDER_FIELDS = ('id', 'kind', 'due_date', 'created_at', 'activity_id', 'subject')
+REMINDERS_EMITTED = Counter('crm_reminders_total', 'Reminder and overdue events emitted', ['kind'])
+
+reminder_heap = []  # (fire_at, activity_id, kind, due_date, user_id)
+reminder_due = {}  # activity_id -> the due date its heap entries are for
+reminder_state = {'pid': None, 'loaded_until': None}
+reminder_wakeup = threading.Condition()
+reminder_start_lock = threading.Lock()
+
+def push_reminders(activity_id, user_id, due_date, now):
+    # Caller holds reminder_wakeup. Past the due date only "overdue" is left.
+    reminder_due[activity_id] = due_date
+    if due_date > now:
+        heapq.heappush(reminder_heap, (due_date - timedelta(minutes=REMINDER_LEAD_MINUTES), activity_id, 'reminder', due_date, user_id))
+    heapq.heappush(reminder_heap, (due_date, activity_id, 'overdue', due_date, user_id))
+
+def schedule_reminders(rows):
+    # rows: (id, user_id, due_date, completed) as just written. Due dates
+    # past the loaded window are left for the refresh that reaches them.
+    if reminder_state['pid'] != os.getpid():
+        return
+    now = datetime.utcnow()
+    with reminder_wakeup:
+        for activity_id, user_id, due_date, completed in rows:
+            reminder_due.pop(activity_id, None)
+            if due_date is not None and not completed and due_date <= reminder_state['loaded_until']:
+                push_reminders(activity_id, user_id, due_date, now)
+        reminder_wakeup.notify()
+
+def schedule_activity_reminders(ids):
+    # For writes made in bulk; the rows are pushed when the transaction
+    # commits, as until then the scheduler cannot see them
+    if reminder_state['pid'] != os.getpid() or not ids:
+        return
+    rows = db.session.execute(db.select(Activity.id, Activity.user_id, Activity.due_date, Activity.completed).where(
+        Activity.id.in_(ids), Activity.due_date <= reminder_state['loaded_until']
+    )).all()
+    db.session.info.setdefault('pending_reminders', []).extend(rows)
+
+@db.event.listens_for(Session, 'after_commit')
+def push_pending_reminders(session):
+    rows = session.info.pop('pending_reminders', None)
+    if rows:
+        schedule_reminders(rows)
+
+@db.event.listens_for(Session, 'after_rollback')
+def drop_pending_reminders(session):
+    session.info.pop('pending_reminders', None)
+
+def load_reminder_window(now):
+    # Writes racing this query push themselves once loaded_until has moved,
+    # so rows already in the heap are left alone
+    with reminder_wakeup:
+        start = reminder_state['loaded_until']
+        end = now + timedelta(minutes=REMINDER_LEAD_MINUTES, seconds=2 * REMINDER_REFRESH_SECONDS)
+        reminder_state['loaded_until'] = end
+    try:
+        rows = db.session.execute(db.select(Activity.id, Activity.user_id, Activity.due_date).where(
+            Activity.completed == db.false(), Activity.due_date > start, Activity.due_date <= end
+        )).all()
+        db.session.rollback()
+    except SQLAlchemyError:
+        with reminder_wakeup:
+            reminder_state['loaded_until'] = start
+        raise
+    with reminder_wakeup:
+        for activity_id, user_id, due_date in rows:
+            if activity_id not in reminder_due:
+                push_reminders(activity_id, user_id, due_date, now)
+
+def fire_reminders(now):
+    entries = []
+    with reminder_wakeup:
+        while reminder_heap and reminder_heap[0][0] <= now:
+            entry = heapq.heappop(reminder_heap)
+            if reminder_due.get(entry[1]) == entry[3]:
+                entries.append(entry)
+    if not entries:
+        return
+    try:
+        current = dict(db.session.execute(db.select(Activity.id, Activity.due_date).where(
+            Activity.id.in_({entry[1] for entry in entries}), Activity.completed == db.false()
+        )).all())
+        events = [
+            {'activity_id': activity_id, 'kind': kind, 'due_date': due_date, 'user_id': user_id, 'created_at': now}
+            for _, activity_id, kind, due_date, user_id in entries if current.get(activity_id) == due_date
+        ]
+        emitted = []
+        if events:
+            stmt = dialect_insert(Reminder).on_conflict_do_nothing(index_elements=['activity_id', 'kind', 'due_date'])
+            emitted = db.session.execute(stmt.returning(Reminder.activity_id, Reminder.kind), events).all()
+        db.session.commit()
+    except SQLAlchemyError:
+        db.session.rollback()
+        with reminder_wakeup:
+            for entry in entries:
+                heapq.heappush(reminder_heap, entry)
+        raise
+    with reminder_wakeup:
+        for _, activity_id, kind, due_date, _ in entries:
+            if kind == 'overdue' and reminder_due.get(activity_id) == due_date:
+                del reminder_due[activity_id]
+    for activity_id, kind in emitted:
+        REMINDERS_EMITTED.labels(kind).inc()
+        logger.info('Activity %s %s', activity_id, 'is overdue' if kind == 'overdue' else 'is due soon')
+
+def run_reminder_scheduler(app):
+    next_load = 0
+    while True:
+        try:
+            with app.app_context():
+                if time.monotonic() >= next_load:
+                    next_load = time.monotonic() + REMINDER_REFRESH_SECONDS
+                    load_reminder_window(datetime.utcnow())
+                fire_reminders(datetime.utcnow())
+        except Exception:
+            logger.exception('Reminder scheduler failed')
+        with reminder_wakeup:
+            timeout = next_load - time.monotonic()
+            if reminder_heap:
+                timeout = min(timeout, (reminder_heap[0][0] - datetime.utcnow()).total_seconds())
+            if timeout > 0:
+                reminder_wakeup.wait(timeout)
+
+@api.before_app_request
+def start_reminder_scheduler():
+    # Started on the first request in each process, so after gunicorn forks;
+    # the first window reaches REMINDER_CATCH_UP_MINUTES back to cover
+    # restarts, and events already written are not written again
+    if not REMINDER_SCHEDULER or reminder_state['pid'] == os.getpid():
+        return
+    with reminder_start_lock:
+        if reminder_state['pid'] == os.getpid():
+            return
+        reminder_heap.clear()
+        reminder_due.clear()
+        reminder_state['loaded_until'] = datetime.utcnow() - timedelta(minutes=REMINDER_CATCH_UP_MINUTES)
+        reminder_state['pid'] = os.getpid()
+        threading.Thread(target=run_reminder_scheduler, args=(current_app._get_current_object(),),
+                         name='reminder-scheduler', daemon=True).start()
+
+@api.route('/api/reminders', methods=['GET'])
+@jwt_required()
+def get_reminders():
+    # Events in id order after ?after=<last id seen>, for clients to poll
+    user_id = get_jwt_identity()
+    try:
+        after = int(request.args.get('after', 0))
+    except ValueError:
+        return jsonify({'error': 'after must be an integer'}), 400
+    
+    rows = db.session.execute(
+        db.select(Reminder.id, Reminder.kind, Reminder.due_date, Reminder.created_at, Reminder.activity_id, Activity.subject)
+        .join(Activity, Activity.id == Reminder.activity_id)
+        .where(Reminder.user_id == user_id, Reminder.id > after)
+        .order_by(Reminder.id).limit(REMINDER_PAGE_LIMIT)
+    ).all()
+    
+    return jsonify({'items': serialize_rows(REMINDER_FIELDS, rows), 'last_id': rows[-1].id if rows else after}), 200
+
+# Bulk Routes
+BULK_CHUNK_SIZE = int(os.getenv('BULK_CHUNK_SIZE', 1000))
+BULK_MAX_ITEMS = int(os.getenv('BULK_MAX_ITEMS', 50000))
+
+def parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+
+def parse_datetime(value):
+    # Stored and compared as naive UTC, like every utcnow() timestamp
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def parse_number(value):
+    # bool is an int subclass but never a meaningful amount
+    if isinstance(value, bool) or not math.isfinite(float(value)):
+        raise ValueError(value)
+    return float(value)
+
+def parse_probability(value):
+    if value is None:
+        return None
+    probability = int(value)
+    if isinstance(value, bool) or not 0 <= probability <= 100:
+        raise ValueError(value)
+    return probability
+
+# Writable columns per resource: field -> (required, default, parser).
+# Foreign keys listed in create_only are fixed once the row exists, matching
+# the single-row update routes.
+BULK_RESOURCES = {
+    'customers': {
+        'model': Customer,
+        'writable': {
+            'name': (True, None, None),
+            'email': (False, None, None),
+            'phone': (False, None, None),
+            'company': (False, None, None),
+            'industry': (False, None, None),
+            'status': (False, 'active', None),
+            'external_id': (False, None, None),
+        },
+        'create_only': (),
+    },
+    'contacts': {
+        'model': Contact,
+        'writable': {
+            'first_name': (True, None, None),
+            'last_name': (True, None, None),
+            'email': (False, None, None),
+            'phone': (False, None, None),
+            'position': (False, None, None),
+            'customer_id': (True, None, None),
+            'external_id': (False, None, None),
+        },
+        'create_only': ('customer_id',),
+    },
+    'deals': {
+        'model': Deal,
+        'writable': {
+            'title': (True, None, None),
+            'value': (True, None, parse_number),
+            'stage': (False, 'prospecting', None),
+            'probability': (False, 0, parse_probability),
+            'expected_close_date': (False, None, parse_date),
+            'customer_id': (True, None, None),
+            'external_id': (False, None, None),
+        },
+        'create_only': ('customer_id',),
+    },
+    'activities': {
+        'model': Activity,
+        'writable': {
+            'type': (True, None, None),
+            'subject': (True, None, None),
+            'description': (False, None, None),
+            'due_date': (False, None, parse_datetime),
+            'completed': (False, False, None),
+            'customer_id': (False, None, None),
+            'deal_id': (False, None, None),
+            'external_id': (False, None, None),
+        },
+        'create_only': ('customer_id', 'deal_id'),
+    },
+}
+
+def row_values(spec, data, partial=False):
+    if not isinstance(data, dict):
+        raise ValueError('Item must be an object')
+    values = {}
+    for field, (required, default, parse) in spec['writable'].items():
+        if partial and field in spec['create_only']:
+            continue
+        if field in data and parse:
+            try:
+                values[field] = parse(data[field])
+            except (ValueError, TypeError, AttributeError):
+                raise ValueError(f'Invalid {field}: {data[field]!r}')
+        elif field in data:
+            values[field] = data[field]
+        elif partial:
+            continue
+        elif required:
+            raise ValueError(f'Missing field: {field}')
+        else:
+            values[field] = default
+    return values
+
+def bulk_payload():
+    # Either a JSON array or newline-delimited JSON, one item per line
+    if request.mimetype == 'application/x-ndjson':
+        return [current_app.json.loads(line) for line in request.get_data().splitlines() if line.strip()]
+    items = request.get_json(silent=True)
+    if not isinstance(items, list):
+        raise ValueError('Expected a JSON array or NDJSON body')
+    return items
+
+def owned_rows(model, user_id, ids):
+    columns = [model.id]
+    if model is Deal:
+        columns += [Deal.stage, Deal.value, Deal.probability]
+    # Locked for the rest of the transaction: deal summary deltas are
+    # computed from these values
+    rows = db.session.execute(db.select(*columns).where(model.user_id == user_id, model.id.in_(ids)).with_for_update()).all()
+    return {row.id: row for row in rows}
+
+def bulk_create(spec, user_id, items):
+    model = spec['model']
+    rows = [dict(values, user_id=user_id) for _, values in items]
+    ids = db.session.scalars(db.insert(model).returning(model.id, sort_by_parameter_order=True), rows).all()
+    sync_search_documents(user_id, model, ids)
+    if model is Activity:
+        schedule_activity_reminders(ids)
+    if model is Deal:
+        apply_deal_summary_deltas(user_id, [deal_row_key(row) for row in rows], 1)
+    return [{'index': index, 'id': row_id} for (index, _), row_id in zip(items, ids)], []
+
+def bulk_update(spec, user_id, items):
+    model = spec['model']
+    owned = owned_rows(model, user_id, [values['id'] for _, values in items])
+    now = datetime.utcnow()
+    found = [(index, values) for index, values in items if values['id'] in owned]
+    errors = [{'index': index, 'error': 'Not found'} for index, values in items if values['id'] not in owned]
+    if found:
+        db.session.execute(db.update(model), [dict(values, updated_at=now) for _, values in found])
+        sync_search_documents(user_id, model, [values['id'] for _, values in found])
+        if model is Activity:
+            schedule_activity_reminders([values['id'] for _, values in found])
+    if model is Deal:
+        befores = [deal_row_key(owned[values['id']]._asdict()) for _, values in found]
+        afters = [deal_row_key(dict(owned[values['id']]._asdict(), **values)) for _, values in found]
+        apply_deal_summary_deltas(user_id, befores, -1)
+        apply_deal_summary_deltas(user_id, afters, 1)
+    return [{'index': index, 'id': values['id']} for index, values in found], errors
+
+def bulk_delete(spec, user_id, items):
+    model = spec['model']
+    owned = owned_rows(model, user_id, [values['id'] for _, values in items])
+    found = [(index, values) for index, values in items if values['id'] in owned]
+    errors = [{'index': index, 'error': 'Not found'} for index, values in items if values['id'] not in owned]
+    if found:
+        ids = [values['id'] for _, values in found]
+        if model is Customer:
+            cascade_customer_delete(user_id, ids)
+        elif model is Deal:
+            apply_deal_summary_deltas(user_id, [deal_row_key(owned[deal_id]._asdict()) for deal_id in ids], -1)
+            detach_deal_activities(user_id, ids)
+        db.session.execute(db.delete(model).where(model.user_id == user_id, model.id.in_(ids)))
+        record_tombstones(user_id, model, ids)
+        sync_search_documents(user_id, model, ids)
+    return [{'index': index, 'id': values['id']} for index, values in found], errors
+
+def run_bulk(operation, spec, user_id, items, chunk_size):
+    results, errors = [], []
+    for start in range(0, len(items), chunk_size):
+        chunk = items[start:start + chunk_size]
+        try:
+            with db.session.begin_nested():
+                chunk_results, chunk_errors = operation(spec, user_id, chunk)
+        except DBAPIError:
+            # Replay the failed chunk row by row to pin the error on the
+            # offending items and keep the rest
+            chunk_results, chunk_errors = [], []
+            for item in chunk:
+                try:
+                    with db.session.begin_nested():
+                        item_results, item_errors = operation(spec, user_id, [item])
+                except DBAPIError as e:
+                    item_results, item_errors = [], [{'index': item[0], 'error': str(e.orig)}]
+                chunk_results += item_results
+                chunk_errors += item_errors
+        if chunk_results:
+            bump_collection_version(user_id, spec['model'])
+        db.session.commit()
+        results += chunk_results
+        errors += chunk_errors
+    return results, errors
+
+@api.route('/api/<resource>/bulk', methods=['POST', 'PUT', 'DELETE'])
+@jwt_required()
+def bulk_write(resource):
+    user_id = get_jwt_identity()
+    spec = BULK_RESOURCES.get(resource)
+    if not spec:
+        return jsonify({'error': 'Unknown resource'}), 404
+
+    try:
+        payload = bulk_payload()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if len(payload) > BULK_MAX_ITEMS:
+        return jsonify({'error': f'At most {BULK_MAX_ITEMS} items per request'}), 413
+
+    try:
+        chunk_size = max(1, min(int(request.args.get('chunk_size', BULK_CHUNK_SIZE)), BULK_CHUNK_SIZE))
+    except ValueError:
+        return jsonify({'error': 'chunk_size must be an integer'}), 400
+
+    # Validate the whole batch up front; invalid items are reported, not fatal
+    items, errors = [], []
+    for index, data in enumerate(payload):
+        try:
+            if request.method == 'POST':
+                values = row_values(spec, data)
+            else:
+                item_id = data.get('id') if isinstance(data, dict) else data
+                if not isinstance(item_id, int) or isinstance(item_id, bool):
+                    raise ValueError('Missing or invalid id')
+                values = {'id': item_id}
+                if request.method == 'PUT':
+                    values.update(row_values(spec, data, partial=True))
+        except (ValueError, TypeError, AttributeError) as e:
+            errors.append({'index': index, 'error': str(e)})
+            continue
+        items.append((index, values))
+
+    operation = {'POST': bulk_create, 'PUT': bulk_update, 'DELETE': bulk_delete}[request.method]
+    results, write_errors = run_bulk(operation, spec, user_id, items, chunk_size)
+
+    return jsonify({
+        'results': results,
+        'errors': sorted(errors + write_errors, key=lambda e: e['index'])
+    }), 201 if request.method == 'POST' and results else 200
+
+# Export Routes
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', 1000))
+
+def ndjson_chunks(fields, result):
+    for rows in result.partitions():
+        yield b''.join(dumps_json(item) + b'\n' for item in serialize_rows(fields, rows))
+
+def csv_chunks(fields, result):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for rows in result.partitions():
+        writer.writerows([json_value(v) for v in row] for row in rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+@api.route('/api/export/<resource>', methods=['GET'])
+@jwt_required()
+def export_resource(resource):
+    user_id = get_jwt_identity()
+    if resource not in RESOURCES:
+        return jsonify({'error': 'Unknown resource'}), 404
+    model, fields = RESOURCES[resource]
+    allow_replica_reads(user_id, (model,))
+
+    if request.args.get('fields'):
+        requested = tuple(f for f in request.args['fields'].split(',') if f)
+        unknown = [f for f in requested if f not in fields]
+        if unknown:
+            return jsonify({'error': f"Unknown fields: {', '.join(unknown)}"}), 400
+        fields = requested
+
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in ('ndjson', 'csv'):
+        return jsonify({'error': 'format must be ndjson or csv'}), 400
+
+    stmt = db.select(*[getattr(model, f) for f in fields]).where(model.user_id == user_id)
+    if request.args.get('since'):
+        try:
+            since = parse_datetime(request.args['since'])
+        except ValueError:
+            return jsonify({'error': 'since must be an ISO 8601 timestamp'}), 400
+        # Inclusive, so rows sharing the watermark timestamp are never skipped;
+        # consumers resuming from the last updated_at should upsert by id
+        stmt = stmt.where(model.updated_at >= since)
+    stmt = stmt.order_by(model.updated_at, model.id)
+
+    # yield_per streams through a server-side cursor, so memory stays flat
+    # however many rows the export covers
+    result = db.session.execute(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+    if export_format == 'csv':
+        chunks, mimetype = csv_chunks(fields, result), 'text/csv'
+    else:
+        chunks, mimetype = ndjson_chunks(fields, result), 'application/x-ndjson'
+    response = Response(stream_with_context(chunks), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename={resource}.{export_format}'
+    return response
+
+# Import Routes
+IMPORT_CHUNK_SIZE = int(os.getenv('IMPORT_CHUNK_SIZE', 1000))
+IMPORT_MAX_ERRORS = int(os.getenv('IMPORT_MAX_ERRORS', 100))
+import_executor = ThreadPoolExecutor(max_workers=int(os.getenv('IMPORT_WORKERS', 2)), thread_name_prefix='import')
+
+# Foreign keys an import row may give by the parent's external_id instead
+IMPORT_REFERENCES = {
+    'customer_id': ('customer_external_id', Customer),
+    'deal_id': ('deal_external_id', Deal),
+}
+
+def import_job_json(job):
+    elapsed = ((job.finished_at or datetime.utcnow()) - job.started_at).total_seconds() if job.started_at else 0
+    return {
+        'id': job.id,
+        'resource': job.resource,
+        'format': job.format,
+        'status': job.status,
+        'progress': round(job.bytes_read / job.bytes_total, 4) if job.bytes_total else 0,
+        'rows_processed': job.rows_processed,
+        'rows_failed': job.rows_failed,
+        'rows_per_second': round(job.rows_processed / elapsed, 1) if elapsed > 0 else None,
+        'errors': json.loads(job.errors) if job.errors else [],
+        'created_at': job.created_at.isoformat(),
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None
+    }
+
+def import_records(path, import_format):
+    # Yields (record, bytes consumed so far); only one read-ahead buffer of
+    # the file is ever in memory
+    with open(path, 'rb') as raw:
+        text = io.TextIOWrapper(raw, encoding='utf-8-sig', newline='')
+        if import_format == 'csv':
+            for record in csv.DictReader(text):
+                # Blank cells mean "not provided" so column defaults apply
+                yield {k: v for k, v in record.items() if v != ''}, raw.tell()
+        else:
+            for line in text:
+                if line.strip():
+                    # A malformed line is passed on as its error so the job
+                    # records it against that row and carries on
+                    try:
+                        record = current_app.json.loads(line)
+                    except ValueError as e:
+                        record = ValueError(f'Invalid JSON: {e}')
+                    yield record, raw.tell()
+
+def coerce_import_value(column, value):
+    # CSV cells arrive as strings; NDJSON values already carry their type
+    if not isinstance(value, str) or column is None:
+        return value
+    if isinstance(column.type, db.Boolean):
+        return value.strip().lower() in ('1', 'true', 'yes', 'y')
+    if isinstance(column.type, db.Integer):
+        return int(value)
+    if isinstance(column.type, db.Float):
+        return float(value)
+    return value
+
+def import_upsert(spec, user_id, items):
+    model = spec['model']
+    keyed = [dict(values, user_id=user_id) for _, values in items if values.get('external_id')]
+    unkeyed = [dict(values, user_id=user_id) for _, values in items if not values.get('external_id')]
+    ids = []
+    if keyed:
+        stmt = dialect_insert(model)
+        updates = {field: stmt.excluded[field] for field in keyed[0] if field not in ('user_id', 'external_id')}
+        updates['updated_at'] = datetime.utcnow()
+        stmt = stmt.on_conflict_do_update(index_elements=['user_id', 'external_id'], set_=updates)
+        ids += db.session.scalars(stmt.returning(model.id), keyed).all()
+    if unkeyed:
+        ids += db.session.scalars(db.insert(model).returning(model.id), unkeyed).all()
+    sync_search_documents(user_id, model, ids)
+    if model is Activity:
+        schedule_activity_reminders(ids)
+    return [{'index': index} for index, _ in items], []
+
+def resolve_references(user_id, rows):
+    # One lookup query per referenced table for the whole chunk
+    lookups = {}
+    for field, (key, model) in IMPORT_REFERENCES.items():
+        keys = {str(data[key]) for _, data in rows if data.get(key) is not None}
+        if keys:
+            lookups[field] = dict(db.session.execute(
+                db.select(model.external_id, model.id).where(model.user_id == user_id, model.external_id.in_(keys))
+            ).all())
+    resolved = []
+    errors = []
+    for index, data in rows:
+        for field, (key, model) in IMPORT_REFERENCES.items():
+            if data.get(key) is None:
+                continue
+            parent_id = lookups.get(field, {}).get(str(data.pop(key)))
+            if parent_id is None:
+                errors.append({'index': index, 'error': f'Unknown {key}'})
+                break
+            data[field] = parent_id
+        else:
+            resolved.append((index, data))
+    return resolved, errors
+
+def import_chunk(job, spec, mapping, chunk):
+    columns = spec['model'].__table__.c
+    rows, errors = [], []
+    for index, record in chunk:
+        if isinstance(record, ValueError):
+            errors.append({'index': index, 'error': str(record)})
+            continue
+        if not isinstance(record, dict):
+            errors.append({'index': index, 'error': 'Each record must be a JSON object'})
+            continue
+        data = dict(record)
+        for target, source in mapping.items():
+            data[target] = record.get(source)
+        rows.append((index, data))
+    rows, reference_errors = resolve_references(job.user_id, rows)
+    errors += reference_errors
+
+    items = []
+    for index, data in rows:
+        try:
+            data = {k: coerce_import_value(columns.get(k), v) for k, v in data.items()}
+            items.append((index, row_values(spec, data)))
+        except (ValueError, TypeError, AttributeError) as e:
+            errors.append({'index': index, 'error': str(e)})
+
+    results, write_errors = run_bulk(import_upsert, spec, job.user_id, items, IMPORT_CHUNK_SIZE)
+    return len(results), sorted(errors + write_errors, key=lambda e: e['index'])
+
+def run_import_job(app, job_id, path, mapping):
+    with app.app_context():
+        job = db.session.get(ImportJob, job_id)
+        spec = BULK_RESOURCES[job.resource]
+        job.status = 'running'
+        job.started_at = datetime.utcnow()
+        db.session.commit()
+        errors = []
+        try:
+            chunk = []
+            for index, (record, position) in enumerate(import_records(path, job.format)):
+                chunk.append((index, record))
+                if len(chunk) == IMPORT_CHUNK_SIZE:
+                    processed, chunk_errors = import_chunk(job, spec, mapping, chunk)
+                    errors, chunk = record_import_progress(job, processed, chunk_errors, errors, position), []
+            if chunk:
+                processed, chunk_errors = import_chunk(job, spec, mapping, chunk)
+                errors = record_import_progress(job, processed, chunk_errors, errors, job.bytes_total)
+            job.status = 'completed'
+            job.bytes_read = job.bytes_total
+        except Exception as e:
+            db.session.rollback()
+            app.logger.exception('Import job %s failed', job_id)
+            job.status = 'failed'
+            errors.append({'index': None, 'error': str(e)})
+            job.errors = json.dumps(errors[:IMPORT_MAX_ERRORS])
+        finally:
+            job.finished_at = datetime.utcnow()
+            if spec['model'] is Deal:
+                # Upserts can move deals between stages; recompute once at the
+                # end, after a failure too, since earlier chunks are committed
+                replace_deal_summary(job.user_id)
+                bump_collection_version(job.user_id, Deal)
+            db.session.commit()
+            os.remove(path)
+
+def record_import_progress(job, processed, chunk_errors, errors, position):
+    errors = (errors + chunk_errors)[:IMPORT_MAX_ERRORS]
+    job.rows_processed += processed
+    job.rows_failed += len(chunk_errors)
+    job.bytes_read = position
+    job.errors = json.dumps(errors)
+    db.session.commit()
+    return errors
+
+@api.route('/api/import/<resource>', methods=['POST'])
+@jwt_required()
+def start_import(resource):
+    user_id = get_jwt_identity()
+    if resource not in BULK_RESOURCES:
+        return jsonify({'error': 'Unknown resource'}), 404
+
+    import_format = request.args.get('format', 'csv')
+    if import_format not in ('csv', 'ndjson'):
+        return jsonify({'error': 'format must be csv or ndjson'}), 400
+    try:
+        mapping = json.loads(request.args.get('mapping') or request.form.get('mapping') or '{}')
+    except ValueError:
+        return jsonify({'error': 'mapping must be a JSON object'}), 400
+    if not isinstance(mapping, dict):
+        return jsonify({'error': 'mapping must be a JSON object'}), 400
+
+    # Spool the upload to disk in fixed-size blocks; the worker reads it back
+    # incrementally after this request has returned
+    fd, path = tempfile.mkstemp(prefix='crm-import-', suffix=f'.{import_format}')
+    with os.fdopen(fd, 'wb') as spool:
+        upload = request.files.get('file')
+        shutil.copyfileobj(upload.stream if upload else request.stream, spool)
+        size = spool.tell()
+
+    job = ImportJob(resource=resource, format=import_format, bytes_total=size, user_id=user_id)
+    db.session.add(job)
+    db.session.commit()
+    import_executor.submit(run_import_job, current_app._get_current_object(), job.id, path, mapping)
+    return jsonify(import_job_json(job)), 202
+
+@api.route('/api/import/jobs/<int:job_id>', methods=['GET'])
+@jwt_required()
+def get_import_job(job_id):
+    user_id = get_jwt_identity()
+    job = ImportJob.query.filter_by(id=job_id, user_id=user_id).first()
+    
+    if not job:
+        return jsonify({'error': 'Import job not found'}), 404
+    
+    return jsonify(import_job_json(job)), 200
+
+# Sync Routes
+# Rows newer than the settle window may belong to transactions that have not
+# committed yet; holding the watermark behind it means a late commit can never
+# land below a cursor a client has already moved past.
+SYNC_PAGE_LIMIT = int(os.getenv('SYNC_PAGE_LIMIT', 500))
+SYNC_SETTLE_SECONDS = float(os.getenv('SYNC_SETTLE_SECONDS', 5))
+SYNC_TOMBSTONE_DAYS = int(os.getenv('SYNC_TOMBSTONE_DAYS', 90))
+
+def encode_sync_token(state):
+    return base64.urlsafe_b64encode(json.dumps(state).encode()).decode().rstrip('=')
+
+def decode_sync_token(token):
+    state = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    if not isinstance(state, dict):
+        raise ValueError('Invalid sync token')
+    return {key: (datetime.fromisoformat(value[0]), int(value[1])) for key, value in state.items() if value}
+
+def sync_page(stmt, timestamp, row_id, after, upper):
+    stmt = stmt.where(timestamp <= upper).order_by(timestamp, row_id).limit(SYNC_PAGE_LIMIT + 1)
+    if after:
+        stmt = stmt.where(db.tuple_(timestamp, row_id) > after)
+    rows = db.session.execute(stmt).all()
+    return rows[:SYNC_PAGE_LIMIT], len(rows) > SYNC_PAGE_LIMIT
+
+@api.route('/api/sync', methods=['GET'])
+@jwt_required()
+def sync():
+    user_id = get_jwt_identity()
+    try:
+        cursors = decode_sync_token(request.args['since']) if request.args.get('since') else {}
+    except (ValueError, TypeError, IndexError):
+        return jsonify({'error': 'Invalid sync token'}), 400
+
+    # Tombstones are pruned after SYNC_TOMBSTONE_DAYS; an older token may
+    # have missed deletes and has to start over with a full sync
+    deleted_after = cursors.get('deleted')
+    if deleted_after and deleted_after[0] < datetime.utcnow() - timedelta(days=SYNC_TOMBSTONE_DAYS):
+        return jsonify({'error': 'Sync token expired; start a full sync without since'}), 410
+
+    upper = datetime.utcnow() - timedelta(seconds=SYNC_SETTLE_SECONDS)
+    state = {key: [value[0].isoformat(), value[1]] for key, value in cursors.items()}
+    changed, deleted, has_more = {}, {}, False
+
+    for resource, (model, fields) in RESOURCES.items():
+        stmt = db.select(*[getattr(model, f) for f in fields]).where(model.user_id == user_id)
+        rows, more = sync_page(stmt, model.updated_at, model.id, cursors.get(resource), upper)
+        changed[resource] = serialize_rows(fields, rows)
+        has_more = has_more or more
+        if rows:
+            state[resource] = [rows[-1].updated_at.isoformat(), rows[-1].id]
+
+    stmt = db.select(Tombstone.id, Tombstone.resource, Tombstone.row_id, Tombstone.deleted_at).where(Tombstone.user_id == user_id)
+    rows, more = sync_page(stmt, Tombstone.deleted_at, Tombstone.id, deleted_after, upper)
+    has_more = has_more or more
+    tables = {model.__tablename__: resource for resource, (model, _) in RESOURCES.items()}
+    for row in rows:
+        deleted.setdefault(tables[row.resource], []).append(row.row_id)
+    if rows:
+        state['deleted'] = [rows[-1].deleted_at.isoformat(), rows[-1].id]
+
+    return jsonify({
+        'changed': changed,
+        'deleted': deleted,
+        'next_token': encode_sync_token(state),
+        'has_more': has_more
+    }), 200
+
+@api.cli.command('prune-tombstones')
+def prune_tombstones():
+    """Delete tombstones older than SYNC_TOMBSTONE_DAYS."""
+    cutoff = datetime.utcnow() - timedelta(days=SYNC_TOMBSTONE_DAYS)
+    result = db.session.execute(db.delete(Tombstone).where(Tombstone.deleted_at < cutoff))
+    db.session.commit()
+    print(f'Pruned {result.rowcount} tombstones')
+
+# Search Routes
+SEARCH_PAGE_LIMIT = int(os.getenv('SEARCH_PAGE_LIMIT', 20))
+TYPEAHEAD_LIMIT = 10
+SEARCH_TABLES = {model.__tablename__: resource for resource, (model, _) in RESOURCES.items() if model in SEARCH_SOURCES}
+
+def search_terms(q):
+    # Word characters only: every term becomes a prefix match, and nothing
+    # from the user can reach the query syntax of either backend
+    return re.findall(r'\w+', q.lower())[:8]
+
+def run_search(user_id, terms, tables, limit, offset, with_body):
+    # Both queries are answered from the full-text index alone
+    if db.engine.dialect.name == 'postgresql':
+        sql = (
+            f"SELECT resource, row_id, label{', body' if with_body else ''}, ts_rank(search_vector, query) AS rank "
+            "FROM search_document, to_tsquery('simple', :query) AS query "
+            "WHERE user_id = :user_id AND search_vector @@ query AND resource IN :tables "
+            "ORDER BY rank DESC, id LIMIT :limit OFFSET :offset"
+        )
+        query = ' & '.join(f'{term}:*' for term in terms)
+    else:
+        sql = (
+            f"SELECT resource, row_id, label{', body' if with_body else ''}, -bm25(search_fts, 0.0, 10.0, 1.0) AS rank "
+            "FROM search_fts WHERE search_fts MATCH :query AND resource IN :tables "
+            "ORDER BY rank DESC LIMIT :limit OFFSET :offset"
+        )
+        query = ' AND '.join([f'user_key:"u{user_id}"'] + [f'{{label body}}:"{term}"*' for term in terms])
+    stmt = db.text(sql).bindparams(db.bindparam('tables', expanding=True))
+    return db.session.execute(stmt, {
+        'query': query,
+        'user_id': user_id,
+        'tables': tables,
+        'limit': limit,
+        'offset': offset
+    }).all()
+
+@api.route('/api/search', methods=['GET'])
+@jwt_required()
+def search():
+    user_id = get_jwt_identity()
+    terms = search_terms(request.args.get('q', ''))
+    mode = request.args.get('mode', 'full')
+    if mode not in ('full', 'typeahead'):
+        return jsonify({'error': 'mode must be full or typeahead'}), 400
+
+    resources = request.args.get('types', ','.join(SEARCH_TABLES.values())).split(',')
+    tables = [table for table, resource in SEARCH_TABLES.items() if resource in resources]
+    if not terms or not tables:
+        return jsonify({'items': [], 'next_page': None}), 200
+    allow_replica_reads(user_id, [model for model in SEARCH_SOURCES if model.__tablename__ in tables])
+
+    if mode == 'typeahead':
+        rows = run_search(user_id, terms, tables, TYPEAHEAD_LIMIT, 0, with_body=False)
+        return jsonify({'items': [
+            {'type': SEARCH_TABLES[row.resource], 'id': row.row_id, 'label': row.label} for row in rows
+        ]}), 200
+
+    try:
+        page = max(1, int(request.args.get('page', 1)))
+    except ValueError:
+        return jsonify({'error': 'page must be an integer'}), 400
+    rows = run_search(user_id, terms, tables, SEARCH_PAGE_LIMIT + 1, (page - 1) * SEARCH_PAGE_LIMIT, with_body=True)
+    return jsonify({
+        'items': [{
+            'type': SEARCH_TABLES[row.resource],
+            'id': row.row_id,
+            'label': row.label,
+            'detail': (row.body or '').strip() or None,
+            'rank': float(row.rank)
+        } for row in rows[:SEARCH_PAGE_LIMIT]],
+        'next_page': page + 1 if len(rows) > SEARCH_PAGE_LIMIT else None
+    }), 200
+
+# Lookup Routes
+# (id, label) pairs for select boxes and id-to-name resolution. Each user's
+# list is cached in-process under the collection version it was read at;
+# every write path bumps that version, so a write anywhere, in any worker,
+# retires the entry and no stale label is ever served.
+LOOKUP_CACHE_SIZE = int(os.getenv('LOOKUP_CACHE_SIZE', 256))
+LOOKUP_LABELS = {
+    'customers': (Customer, Customer.name),
+    'contacts': (Contact, Contact.first_name + ' ' + Contact.last_name),
+    'deals': (Deal, Deal.title),
+    'activities': (Activity, Activity.subject),
+}
+lookup_cache = OrderedDict()
+lookup_cache_lock = threading.Lock()
+
+def lookup_entry(user_id, resource, version):
+    key = (user_id, resource)
+    with lookup_cache_lock:
+        entry = lookup_cache.get(key)
+        if entry and entry[0] == version:
+            lookup_cache.move_to_end(key)
+            return entry
+
+    model, label = LOOKUP_LABELS[resource]
+    pairs = [tuple(row) for row in db.session.execute(
+        db.select(model.id, label).where(model.user_id == user_id).order_by(label, model.id)
+    )]
+    # The full list is kept pre-encoded; ids= requests pick from the dict
+    entry = (version, dict(pairs), dumps_json({'items': pairs}))
+    with lookup_cache_lock:
+        current = lookup_cache.get(key)
+        if current is None or current[0] <= version:
+            lookup_cache[key] = entry
+            lookup_cache.move_to_end(key)
+        while len(lookup_cache) > LOOKUP_CACHE_SIZE:
+            lookup_cache.popitem(last=False)
+    return entry
+
+@api.route('/api/lookup/<resource>', methods=['GET'])
+@jwt_required()
+def lookup(resource):
+    if resource not in LOOKUP_LABELS:
+        return jsonify({'error': 'Unknown resource'}), 404
+
+    ids = None
+    if request.args.get('ids'):
+        try:
+            ids = [int(i) for i in request.args['ids'].split(',') if i]
+        except ValueError:
+            return jsonify({'error': 'ids must be a comma-separated list of integers'}), 400
+
+    user_id = get_jwt_identity()
+    model = LOOKUP_LABELS[resource][0]
+    allow_replica_reads(user_id, (model,))
+    version = collection_version(user_id, model)
+    etag = collection_etag(user_id, model, version)
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        _, labels, body = lookup_entry(user_id, resource, version)
+        if ids is None:
+            response = current_app.response_class(body, mimetype='application/json')
+        else:
+            # Unknown and foreign ids are left out rather than reported
+            response = jsonify({'items': [[i, labels[i]] for i in dict.fromkeys(ids) if i in labels]})
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+# Batch Routes
+# Several API calls in one HTTP round trip. The batch request is
+# authenticated once; its sub-requests call the views behind the JWT check
+# and, run in order, share the batch's database session. With "parallel",
+# GET-only batches fan out over a thread pool, each sub-request in a worker
+# with its own session, which pays off when reads wait on the database.
+BATCH_MAX_REQUESTS = int(os.getenv('BATCH_MAX_REQUESTS', 20))
+BATCH_WORKERS = int(os.getenv('BATCH_WORKERS', 4))
+BATCH_METHODS = ('GET', 'POST', 'PUT', 'DELETE')
+batch_executor = ThreadPoolExecutor(max_workers=BATCH_WORKERS, thread_name_prefix='batch')
+
+def batch_item_error(status, message):
+    return status, dumps_json({'error': message}), None
+
+def run_batch_item(item):
+    # Returns (status, JSON body bytes, ETag) for one sub-request
+    url = urlsplit(item['path'])
+    if not url.path.startswith('/api/') or url.path == '/api/batch':
+        return batch_item_error(400, 'path must be an API route other than /api/batch')
+    headers = {'If-None-Match': item['if_none_match']} if item.get('if_none_match') else {}
+    body = {'json': item['body']} if 'body' in item else {}
+    with current_app.test_request_context(url.path, method=item['method'], query_string=url.query, headers=headers, **body):
+        if request.routing_exception is not None:
+            return batch_item_error(request.routing_exception.code, request.routing_exception.name)
+        view = current_app.view_functions[request.url_rule.endpoint]
+        try:
+            # Skip jwt_required; the identity verified for the batch is in g
+            response = current_app.make_response(getattr(view, '__wrapped__', view)(**request.view_args))
+        except HTTPException as e:
+            return batch_item_error(e.code, e.name)
+        except Exception:
+            logger.exception('Batch sub-request %s %s failed', item['method'], item['path'])
+            db.session.rollback()
+            return batch_item_error(500, 'Internal server error')
+        finally:
+            # Sub-requests share g; the next one may be a write
+            end_replica_reads()
+        if response.is_streamed:
+            response.close()
+            return batch_item_error(400, 'Streaming endpoints cannot be batched')
+        data = response.get_data()
+        if response.status_code == 304:
+            data = b'null'
+        elif not response.is_json:
+            data = dumps_json(response.get_data(as_text=True))
+        return response.status_code, data, response.headers.get('ETag')
+
+def run_batch_item_in_worker(app, authorization, item):
+    with app.test_request_context(headers={'Authorization': authorization}):
+        verify_jwt_in_request()
+        return run_batch_item(item)
+
+def batch_items(data):
+    if isinstance(data, dict):
+        data = data.get('requests')
+    if not isinstance(data, list) or not data:
+        raise ValueError('Body must be a non-empty list of requests')
+    if len(data) > BATCH_MAX_REQUESTS:
+        raise ValueError(f'At most {BATCH_MAX_REQUESTS} requests per batch')
+    items = []
+    for index, item in enumerate(data):
+        if isinstance(item, str):
+            item = {'path': item}
+        if not isinstance(item, dict) or not isinstance(item.get('path'), str):
+            raise ValueError(f'Request {index} needs a path')
+        method = str(item.get('method', 'GET')).upper()
+        if method not in BATCH_METHODS:
+            raise ValueError(f'Request {index} has an unsupported method')
+        items.append(dict(item, method=method))
+    return items
+
+@api.route('/api/batch', methods=['POST'])
+@jwt_required()
+def batch():
+    data = request.get_json(silent=True)
+    try:
+        items = batch_items(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    parallel = isinstance(data, dict) and bool(data.get('parallel'))
+    if parallel and any(item['method'] != 'GET' for item in items):
+        return jsonify({'error': 'Only GET requests can run in parallel'}), 400
+
+    if parallel and len(items) > 1:
+        app = current_app._get_current_object()
+        authorization = request.headers.get('Authorization')
+        results = list(batch_executor.map(lambda item: run_batch_item_in_worker(app, authorization, item), items))
+    else:
+        results = [run_batch_item(item) for item in items]
+
+    # Sub-responses are already encoded; splice them in rather than decoding
+    # and encoding them again
+    parts = []
+    for status, body, etag in results:
+        head = {'status': status, 'etag': etag} if etag else {'status': status}
+        parts.append(dumps_json(head)[:-1] + b',"body":' + body + b'}')
+    return current_app.response_class(b'{"responses":[' + b','.join(parts) + b']}', mimetype='application/json')
+
+# Request metrics
+# SQL is accounted through engine events, so every statement counts towards
+# the request that issued it whichever helper ran it. Under gunicorn, set
+# PROMETHEUS_MULTIPROC_DIR so /metrics reports all workers, not just the one
+# that answered the scrape.
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', 200))
+logger = logging.getLogger(__name__)
+
+REQUEST_LATENCY = Histogram('crm_request_duration_seconds', 'Request latency', ['endpoint', 'method'])
+REQUEST_COUNT = Counter('crm_requests_total', 'Requests served', ['endpoint', 'method', 'status'])
+REQUEST_QUERIES = Histogram('crm_request_db_queries', 'SQL statements per request', ['endpoint'],
+                            buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100))
+REQUEST_DB_TIME = Histogram('crm_request_db_seconds', 'Time spent in SQL per request', ['endpoint'])
+RESPONSE_SIZE = Histogram('crm_response_size_bytes', 'Response body size, for non-streamed responses', ['endpoint'],
+                          buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304))
+SLOW_QUERIES = Counter('crm_slow_queries_total', 'Statements slower than SLOW_QUERY_MS', ['endpoint'])
+
+@db.event.listens_for(Engine, 'before_cursor_execute')
+def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+@db.event.listens_for(Engine, 'after_cursor_execute')
+def record_query_time(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_start'].pop()
+    in_request = has_request_context() and 'request_start' in g
+    endpoint = 'background'
+    if in_request:
+        endpoint = request.endpoint or 'unmatched'
+        g.db_queries += 1
+        g.db_seconds += elapsed
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        # Parameters are left out; they carry customer data. Statements from
+        # CLI commands and migrations are logged but not counted.
+        if in_request:
+            SLOW_QUERIES.labels(endpoint).inc()
+        logger.warning('Slow query (%.1f ms) in %s: %s', elapsed * 1000, endpoint, statement)
+
+@db.event.listens_for(Engine, 'handle_error')
+def discard_query_timer(context):
+    if context.connection is not None and context.connection.info.get('query_start'):
+        context.connection.info['query_start'].pop()
+
+@api.before_app_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    g.db_queries = 0
+    g.db_seconds = 0.0
+
+@api.after_app_request
+def record_request_metrics(response):
+    if 'request_start' not in g:
+        return response
+    elapsed = time.perf_counter() - g.request_start
+    endpoint = request.endpoint or 'unmatched'
+    REQUEST_LATENCY.labels(endpoint, request.method).observe(elapsed)
+    REQUEST_COUNT.labels(endpoint, request.method, response.status_code).inc()
+    REQUEST_QUERIES.labels(endpoint).observe(g.db_queries)
+    REQUEST_DB_TIME.labels(endpoint).observe(g.db_seconds)
+    size = response.calculate_content_length()
+    if size is not None:
+        RESPONSE_SIZE.labels(endpoint).observe(size)
+    response.headers.add(
+        'Server-Timing',
+        f'app;dur={elapsed * 1000:.1f}, db;desc="{g.db_queries} queries";dur={g.db_seconds * 1000:.1f}'
+    )
+    return response
+
+@api.route('/metrics', methods=['GET'])
+def metrics():
+    registry = REGISTRY
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return Response(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
+
 # Health Check
-@app.route('/health', methods=['GET'])
+@api.route('/health', methods=['GET'])
 def health_check():
-    return jsonify({'status': 'healthy'}), 200
+    if request.args.get('db') != '1':
+        return jsonify({'status': 'healthy'}), 200
+
+    # Readiness: time a pool checkout and a trivial round trip separately,
+    # so pool exhaustion and a slow database are told apart
+    start = time.perf_counter()
+    try:
+        with db.engine.connect() as conn:
+            checked_out = time.perf_counter()
+            conn.execute(db.text('SELECT 1'))
+            queried = time.perf_counter()
+    except SQLAlchemyError as e:
+        logger.warning('Database health check failed: %s', e)
+        return jsonify({'status': 'unhealthy', 'error': 'Database unavailable'}), 503
+    body = {
+        'status': 'healthy',
+        'db': {
+            'checkout_ms': round((checked_out - start) * 1000, 2),
+            'query_ms': round((queried - checked_out) * 1000, 2),
+            'pool': db.engine.pool.status()
+        }
+    }
+    # A replica that is down only sends reads to the primary; report it
+    # without failing readiness
+    replicas = {}
+    for key in current_app.config['REPLICA_BINDS']:
+        engine = db.engines[key]
+        try:
+            with engine.connect() as conn:
+                conn.execute(db.text('SELECT 1'))
+        except SQLAlchemyError as e:
+            replica_down_until[key] = time.monotonic() + REPLICA_RETRY_SECONDS
+            logger.warning('Replica %s health check failed: %s', key, e)
+            replicas[key] = {'status': 'unavailable'}
+        else:
+            replica_down_until.pop(key, None)
+            replicas[key] = {'status': 'healthy', 'pool': engine.pool.status()}
+    if replicas:
+        body['replicas'] = replicas
+    return jsonify(body), 200
 
 # Dashboard Stats
-@app.route('/api/dashboard/stats', methods=['GET'])
+# Per-user results are cached in-process under the customer and deal
+# collection versions they were computed at. Every write path bumps those
+# versions, so a write in any worker retires the entry on the next request.
+DASHBOARD_CACHE_SIZE = int(os.getenv('DASHBOARD_CACHE_SIZE', 256))
+dashboard_cache = OrderedDict()
+dashboard_cache_lock = threading.Lock()
+
+def compute_dashboard_stats(user_id):
+    total_customers, active_customers = db.session.execute(
+        db.select(
+            db.func.count(Customer.id),
+            db.func.count(db.case((Customer.status == 'active', Customer.id)))
+        ).where(Customer.user_id == user_id)
+    ).one()
+
+    # Pipeline totals come from the incrementally maintained summary, so
+    # their cost depends on the number of stages rather than deals
+    deals_by_stage = db.session.execute(
+        db.select(
+            DealStageSummary.stage,
+            DealStageSummary.count,
+            DealStageSummary.total_value,
+            DealStageSummary.weighted_value
+        ).where(DealStageSummary.user_id == user_id, DealStageSummary.count > 0)
+        .order_by(DealStageSummary.stage)
+    ).all()
+
+    return {
+        'total_customers': total_customers,
+        'active_customers': active_customers,
+        'total_deals': sum(s.count for s in deals_by_stage),
+        'total_deal_value': float(sum(s.total_value for s in deals_by_stage)),
+        'weighted_deal_value': float(sum(s.weighted_value for s in deals_by_stage)),
+        'deals_by_stage': [{
+            'stage': s.stage or None,
+            'count': s.count,
+            'value': float(s.total_value),
+            'weighted_value': float(s.weighted_value)
+        } for s in deals_by_stage]
+    }
+
+@api.route('/api/dashboard/stats', methods=['GET'])
 @jwt_required()
+@read_only(Customer, Deal)
 def get_dashboard_stats():
     user_id = get_jwt_identity()
+    version = (collection_version(user_id, Customer), collection_version(user_id, Deal))
     
-    total_customers = Customer.query.filter_by(user_id=user_id).count()
-    active_customers = Customer.query.filter_by(user_id=user_id, status='active').count()
-    total_deals = Deal.query.filter_by(user_id=user_id).count()
-    total_deal_value = db.session.query(db.func.sum(Deal.value)).filter_by(user_id=user_id).scalar() or 0
+    with dashboard_cache_lock:
+        cached = dashboard_cache.get(user_id)
+        if cached and cached[0] == version:
+            dashboard_cache.move_to_end(user_id)
+            response = jsonify(cached[1])
+            response.headers['Cache-Status'] = 'crm-dashboard; hit'
+            return response, 200
     
-    deals_by_stage = db.session.query(
-        Deal.stage,
-        db.func.count(Deal.id),
-        db.func.sum(Deal.value)
-    ).filter_by(user_id=user_id).group_by(Deal.stage).all()
+    stats = compute_dashboard_stats(user_id)
+    with dashboard_cache_lock:
+        current = dashboard_cache.get(user_id)
+        if current is None or current[0] <= version:
+            dashboard_cache[user_id] = (version, stats)
+            dashboard_cache.move_to_end(user_id)
+        while len(dashboard_cache) > DASHBOARD_CACHE_SIZE:
+            dashboard_cache.popitem(last=False)
     
-    return jsonify({
-        'total_customers': total_customers,
-        'active_customers': active_customers,
-        'total_deals': total_deals,
-        'total_deal_value': float(total_deal_value),
-        'deals_by_stage': [{'stage': s[0], 'count': s[1], 'value': float(s[2] or 0)} for s in deals_by_stage]
-    }), 200
+    response = jsonify(stats)
+    response.headers['Cache-Status'] = 'crm-dashboard; fwd=miss' if cached is None else 'crm-dashboard; fwd=stale'
+    return response, 200
+
+# Analytics Routes
+# The forecast is one grouped scan of the user's deals by (stage, close
+# date), served in index order from ix_deal_user_stage_close so the
+# database neither sorts nor visits the table; the few thousand group rows
+# are then rolled up into periods here. Stage history is not stored, so
+# the funnel is read from where deals stand now: a deal in a later stage,
+# or won, counts as having passed the earlier ones.
+PIPELINE_STAGES = ('prospecting', 'qualification', 'proposal', 'negotiation')
+FORECAST_MAX_MONTHS = 60
+
+def epoch_days(column):
+    # Days since 1970-01-01 as a number the database can sum
+    if db.engine.dialect.name == 'postgresql':
+        return db.extract('epoch', column) / 86400
+    return db.func.julianday(column) - 2440587.5
+
+def period_of(day, period):
+    if period == 'month':
+        return f'{day.year}-{day.month:02d}'
+    return f'{day.year}-Q{(day.month - 1) // 3 + 1}'
+
+def forecast_periods(start, months, period):
+    keys = []
+    for offset in range(months):
+        year, month = divmod(start.month - 1 + offset, 12)
+        key = period_of(date(start.year + year, month + 1, 1), period)
+        if key not in keys:
+            keys.append(key)
+    return keys
+
+def compute_forecast(user_id, period, months, now):
+    groups = db.session.execute(
+        db.select(
+            Deal.stage,
+            Deal.expected_close_date,
+            db.func.count().label('deals'),
+            db.func.sum(Deal.value).label('value'),
+            db.func.sum(Deal.value * db.func.coalesce(Deal.probability, 0) / 100).label('weighted_value'),
+            db.func.sum(epoch_days(Deal.created_at)).label('created_days')
+        ).where(Deal.user_id == user_id)
+        .group_by(Deal.stage, Deal.expected_close_date)
+        .order_by(Deal.stage, Deal.expected_close_date)
+    ).all()
+    # Last update of a closed deal stands in for its close date; a separate
+    # range scan keeps the conversion off the far larger set of open deals
+    open_days = dict(db.session.execute(
+        db.select(Deal.stage, db.func.sum(epoch_days(Deal.updated_at) - epoch_days(Deal.created_at)))
+        .where(Deal.user_id == user_id, Deal.stage.in_(CLOSED_DEAL_STAGES))
+        .group_by(Deal.stage)
+    ).all())
+
+    periods = forecast_periods(now.date(), months, period)
+    buckets = {p: {'period': p, 'deals': 0, 'value': 0.0, 'weighted_value': 0.0, 'won_value': 0.0} for p in periods}
+    overdue = {'deals': 0, 'value': 0.0, 'weighted_value': 0.0}
+    unscheduled = dict(overdue)
+    stages = {}
+    for row in groups:
+        stage = row.stage or ''
+        totals = stages.setdefault(stage, {'deals': 0, 'value': 0.0, 'weighted_value': 0.0, 'created_days': 0.0,
+                                           'open_days': float(open_days.get(stage) or 0)})
+        totals['deals'] += row.deals
+        totals['value'] += float(row.value or 0)
+        totals['weighted_value'] += float(row.weighted_value or 0)
+        totals['created_days'] += float(row.created_days or 0)
+
+        key = period_of(row.expected_close_date, period) if row.expected_close_date else None
+        if stage == 'closed-won':
+            if key in buckets:
+                buckets[key]['won_value'] += float(row.value or 0)
+            continue
+        if stage == 'closed-lost':
+            continue
+        target = buckets.get(key)
+        if target is None:
+            target = unscheduled if key is None else overdue if key < periods[0] else None
+        if target is not None:
+            target['deals'] += row.deals
+            target['value'] += float(row.value or 0)
+            target['weighted_value'] += float(row.weighted_value or 0)
+
+    empty = {'deals': 0, 'value': 0.0, 'weighted_value': 0.0, 'created_days': 0.0, 'open_days': 0.0}
+    now_days = (now - datetime(1970, 1, 1)).total_seconds() / 86400
+    won, lost = stages.get('closed-won', empty), stages.get('closed-lost', empty)
+
+    def average_age(totals):
+        return round(now_days - totals['created_days'] / totals['deals'], 1) if totals['deals'] else None
+
+    # Deals at or past each pipeline stage; won deals passed them all
+    reached = {}
+    running = won['deals']
+    for stage in reversed(PIPELINE_STAGES):
+        running += stages.get(stage, empty)['deals']
+        reached[stage] = running
+
+    stage_rows = []
+    for index, stage in enumerate(PIPELINE_STAGES):
+        totals = stages.get(stage, empty)
+        following = reached[PIPELINE_STAGES[index + 1]] if index + 1 < len(PIPELINE_STAGES) else won['deals']
+        stage_rows.append({
+            'stage': stage,
+            'deals': totals['deals'],
+            'value': totals['value'],
+            'weighted_value': totals['weighted_value'],
+            'avg_age_days': average_age(totals),
+            'reached': reached[stage],
+            'conversion': round(following / reached[stage], 4) if reached[stage] else None
+        })
+    for stage, totals in (('closed-won', won), ('closed-lost', lost)):
+        stage_rows.append({
+            'stage': stage,
+            'deals': totals['deals'],
+            'value': totals['value'],
+            'avg_days_to_close': round(totals['open_days'] / totals['deals'], 1) if totals['deals'] else None
+        })
+    # Stages outside the standard pipeline are reported without a funnel
+    for stage in sorted(set(stages) - set(PIPELINE_STAGES) - set(CLOSED_DEAL_STAGES)):
+        totals = stages[stage]
+        stage_rows.append({
+            'stage': stage or None,
+            'deals': totals['deals'],
+            'value': totals['value'],
+            'weighted_value': totals['weighted_value'],
+            'avg_age_days': average_age(totals)
+        })
+
+    decided = won['deals'] + lost['deals']
+    decided_value = won['value'] + lost['value']
+    return {
+        'period': period,
+        'forecast': list(buckets.values()),
+        'overdue': overdue,
+        'unscheduled': unscheduled,
+        'stages': stage_rows,
+        'win_rate': {
+            'won': won['deals'],
+            'lost': lost['deals'],
+            'by_count': round(won['deals'] / decided, 4) if decided else None,
+            'by_value': round(won['value'] / decided_value, 4) if decided_value else None
+        }
+    }
+
+@api.route('/api/analytics/forecast', methods=['GET'])
+@jwt_required()
+@read_only(Deal)
+def get_forecast():
+    user_id = get_jwt_identity()
+    period = request.args.get('period', 'month')
+    if period not in ('month', 'quarter'):
+        return jsonify({'error': 'period must be month or quarter'}), 400
+    try:
+        months = int(request.args.get('months', 12))
+    except ValueError:
+        return jsonify({'error': 'months must be an integer'}), 400
+    months = max(1, min(months, FORECAST_MAX_MONTHS))
+    return jsonify(compute_forecast(user_id, period, months, datetime.utcnow())), 200
+
+# Query plan checks
+def hot_queries(user_id=1):
+    # The statements behind the busiest routes, with representative filters
+    return [
+        ('customers page', page_statement(Customer, CUSTOMER_FIELDS, [Customer.user_id == user_id], DEFAULT_PAGE_LIMIT)),
+        ('contacts page by customer', page_statement(Contact, CONTACT_FIELDS, [Contact.user_id == user_id, Contact.customer_id == 1], DEFAULT_PAGE_LIMIT)),
+        ('contacts page', page_statement(Contact, CONTACT_FIELDS, [Contact.user_id == user_id], DEFAULT_PAGE_LIMIT)),
+        ('deals page', page_statement(Deal, DEAL_FIELDS, [Deal.user_id == user_id], DEFAULT_PAGE_LIMIT)),
+        ('deals page by customer', page_statement(Deal, DEAL_FIELDS, [Deal.user_id == user_id, Deal.customer_id == 1], DEFAULT_PAGE_LIMIT)),
+        ('activities page', page_statement(Activity, ACTIVITY_FIELDS, [Activity.user_id == user_id], DEFAULT_PAGE_LIMIT)),
+        ('activities page by customer', page_statement(Activity, ACTIVITY_FIELDS, [Activity.user_id == user_id, Activity.customer_id == 1], DEFAULT_PAGE_LIMIT)),
+        ('activities page by deal', page_statement(Activity, ACTIVITY_FIELDS, [Activity.user_id == user_id, Activity.deal_id == 1], DEFAULT_PAGE_LIMIT)),
+        ('agenda page', page_statement(Activity, ACTIVITY_FIELDS, [Activity.user_id == user_id, Activity.completed == db.false(), Activity.due_date.isnot(None)], DEFAULT_PAGE_LIMIT, order='due_date')),
+        ('reminder window', db.select(Activity.id, Activity.user_id, Activity.due_date).where(Activity.completed == db.false(), Activity.due_date > datetime(2024, 1, 1), Activity.due_date <= datetime(2024, 1, 2))),
+        ('reminders feed', db.select(Reminder.id).where(Reminder.user_id == user_id, Reminder.id > 0).order_by(Reminder.id).limit(REMINDER_PAGE_LIMIT)),
+        ('archived activities page', page_statement(ActivityArchive, ACTIVITY_FIELDS, [ActivityArchive.user_id == user_id], DEFAULT_PAGE_LIMIT)),
+        ('customer stats', db.select(db.func.count(Customer.id), db.func.count(db.case((Customer.status == 'active', Customer.id)))).where(Customer.user_id == user_id)),
+        ('deals by stage', db.select(DealStageSummary).where(DealStageSummary.user_id == user_id, DealStageSummary.count > 0)),
+    ]
+
+def explain(stmt):
+    conn = db.session.connection()
+    compiled = stmt.compile(dialect=db.engine.dialect)
+    params = compiled.params
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+    if db.engine.dialect.name == 'sqlite':
+        rows = conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + str(compiled), params).all()
+        return [row[-1] for row in rows]
+    # Tables in dev/staging are small enough that the planner would rightly
+    # prefer a seq scan; disabling it shows whether an index *can* be used.
+    conn.exec_driver_sql('SET LOCAL enable_seqscan = off')
+    rows = conn.exec_driver_sql('EXPLAIN ' + str(compiled), params).all()
+    return [row[0] for row in rows]
+
+def plan_problems(plan):
+    problems = []
+    if any('Seq Scan' in line or line.startswith('SCAN ') for line in plan):
+        problems.append('sequential scan')
+    # A page whose ORDER BY is not served by the index sorts every user row
+    if any('FOR ORDER BY' in line for line in plan) or (
+            plan and plan[0].startswith('Limit') and any('->  Sort' in line for line in plan)):
+        problems.append('full sort')
+    return problems
+
+@api.cli.command('check-query-plans')
+def check_query_plans():
+    """Fail if a hot route's query falls back to a sequential scan or full sort."""
+    failures = 0
+    for name, stmt in hot_queries():
+        plan = explain(stmt)
+        problems = plan_problems(plan)
+        if problems:
+            failures += 1
+            print(f"[FAIL] {name}: {', '.join(problems)}")
+        else:
+            print(f'[ok] {name}')
+        for line in plan:
+            print(f'    {line}')
+    db.session.rollback()
+    if failures:
+        raise SystemExit(f'{failures} hot queries are not served by an index')
 
 # Initialize database
+BASELINE_REVISION = '3f1a2b9c7d41'
+
 def init_db():
-    with app.app_context():
-        db.create_all()
-        
-        # Create default admin user if it doesn't exist
-        if not User.query.filter_by(username='admin').first():
-            admin = User(
-                username='admin',
-                email='admin@crm.com',
-                password_hash=generate_password_hash('admin123')
-            )
-            db.session.add(admin)
-            db.session.commit()
+    inspector = db.inspect(db.engine)
+    if not inspector.has_table('user'):
+        # Fresh database: build the current schema directly. Replicas get it
+        # by replication, like every other change.
+        db.create_all(bind_key=None)
+        stamp()
+    else:
+        if not inspector.has_table('alembic_version'):
+            # Deployed before migrations existed; schema matches the baseline
+            stamp(revision=BASELINE_REVISION)
+        upgrade()
+    
+    # Create default admin user if it doesn't exist
+    if not User.query.filter_by(username='admin').first():
+        admin = User(
+            username='admin',
+            email='admin@crm.com',
+            password_hash=generate_password_hash('admin123', PASSWORD_HASH_METHOD)
+        )
+        db.session.add(admin)
+        db.session.commit()
 
-if __name__ == '__main__':
+@api.cli.command('init-db')
+def init_db_command():
+    """Create or migrate the schema and ensure the admin user exists."""
     init_db()
+    print('Database is up to date')
+
+if __name__ == '__main__':
+    # Development server; creates or migrates the database before serving
+    app = create_app()
+    with app.app_context():
+        init_db()
     port = int(os.getenv('PORT', 5000))
     app.run(host='0.0.0.0', port=port, debug=False)
-else:
-    # Initialize database when running as a module (e.g., on Render)
-    init_db()
-
@@ -0,0 +1,457 @@
+"""Seed a synthetic CRM dataset and benchmark every REST route.
+
+Usage:
+    python benchmarks/bench_api.py [--users 20] [--customers 5000] [--requests 200]
+                                   [--http] [--clients 8] [--seed 42]
+                                   [--output results.json] [--compare baseline.json]
+
+Uses DATABASE_URL when set (e.g. a local PostgreSQL), otherwise a throwaway
+SQLite file. Users own customers on a Zipf curve, and contacts, deals and
+activities per customer are skewed too, so a few accounts dominate as in a
+real tenant mix. The same random seed always produces the same data and
+request mix.
+
+Each scenario is prepared up front as a list of requests, so any rows a
+request needs, such as the targets of deletes, exist before timing starts.
+The list is then run through the Flask test client in-process. With --http
+it is also run against gunicorn (gunicorn.conf.py) over keep-alive
+connections. Queries per request are read from the Server-Timing header.
+
+Results are written as JSON (default: benchmarks/results/<commit>.json).
+--compare prints the change against an earlier results file.
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASSWORD = 'bench-password'
+BULK_CHUNK = 5000
+STAGES = ['prospecting', 'qualification', 'proposal', 'negotiation', 'closed-won', 'closed-lost']
+STAGE_WEIGHTS = [35, 25, 15, 10, 10, 5]
+INDUSTRIES = ['Software', 'Retail', 'Finance', 'Healthcare', 'Manufacturing', 'Education']
+ACTIVITY_TYPES = ['call', 'email', 'meeting', 'note']
+QUERIES = re.compile(r'db;desc="(\d+) queries"')
+
+os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db'))
+sys.path.insert(0, BACKEND)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--customers', type=int, default=5000, help='total customers across all users')
+    parser.add_argument('--requests', type=int, default=200, help='requests per scenario')
+    parser.add_argument('--http', action='store_true', help='also drive gunicorn over HTTP')
+    parser.add_argument('--clients', type=int, default=8, help='concurrent HTTP clients')
+    parser.add_argument('--port', type=int, default=5110)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output')
+    parser.add_argument('--compare')
+    return parser.parse_args()
+
+
+def auth(token):
+    return {'Authorization': f'Bearer {token}'}
+
+
+def skewed_count(rng, mean):
+    # Geometric: most customers have a few children, a long tail has many
+    return int(rng.expovariate(1 / mean)) if mean else 0
+
+
+def bulk_create(client, token, resource, rows):
+    ids = []
+    for start in range(0, len(rows), BULK_CHUNK):
+        response = client.post(f'/api/{resource}/bulk', json=rows[start:start + BULK_CHUNK], headers=auth(token))
+        body = response.get_json()
+        if response.status_code != 201 or body['errors']:
+            raise RuntimeError(f'seeding {resource} failed: {body}')
+        ids += [result['id'] for result in body['results']]
+    return ids
+
+
+def customer_row(rng, label):
+    return {
+        'name': f'Customer {label}',
+        'email': f'contact{label}@example.com',
+        'company': f'{rng.choice(["Acme", "Globex", "Initech", "Umbrella", "Hooli"])} {label}',
+        'industry': rng.choice(INDUSTRIES),
+        'status': 'active' if rng.random() < 0.8 else 'inactive',
+    }
+
+
+def contact_row(rng, label, customer_id):
+    return {'first_name': f'First{label}', 'last_name': f'Last{label}', 'email': f'person{label}@example.com',
+            'position': rng.choice(['CEO', 'CTO', 'Buyer', 'Engineer']), 'customer_id': customer_id}
+
+
+def deal_row(rng, label, customer_id, today):
+    return {'title': f'Deal {label}', 'value': round(rng.lognormvariate(9, 1.2), 2),
+            'stage': rng.choices(STAGES, STAGE_WEIGHTS)[0], 'probability': rng.randrange(0, 101, 10),
+            'expected_close_date': (today + timedelta(days=rng.randint(-60, 180))).isoformat(), 'customer_id': customer_id}
+
+
+def activity_row(rng, label, customer_id, deal_id, now):
+    due = now + timedelta(days=rng.uniform(-90, 60))
+    return {'type': rng.choice(ACTIVITY_TYPES), 'subject': f'Follow up {label}', 'due_date': due.isoformat(),
+            'completed': due < now and rng.random() < 0.7, 'customer_id': customer_id, 'deal_id': deal_id}
+
+
+def seed(client, args, rng):
+    # Users are weighted 1, 1/2, 1/3, ... so the first few own most rows
+    run = f'{int(time.time())}{rng.randrange(1000)}'
+    weights = [1 / (i + 1) for i in range(args.users)]
+    now = datetime.utcnow()
+    users = []
+    counts = {'users': 0, 'customers': 0, 'contacts': 0, 'deals': 0, 'activities': 0}
+    for index, weight in enumerate(weights):
+        username = f'bench-{run}-{index}'
+        response = client.post('/api/auth/register', json={
+            'username': username, 'email': f'{username}@example.com', 'password': PASSWORD
+        })
+        token = response.get_json()['access_token']
+        n = max(1, round(args.customers * weight / sum(weights)))
+        customer_ids = bulk_create(client, token, 'customers', [customer_row(rng, f'{index}-{i}') for i in range(n)])
+        contacts, deals = [], []
+        for customer_id in customer_ids:
+            contacts += [contact_row(rng, f'{customer_id}-{i}', customer_id) for i in range(skewed_count(rng, 3))]
+            deals += [deal_row(rng, f'{customer_id}-{i}', customer_id, now.date()) for i in range(skewed_count(rng, 2))]
+        contact_ids = bulk_create(client, token, 'contacts', contacts)
+        deal_ids = bulk_create(client, token, 'deals', deals)
+        deal_customers = dict(zip(deal_ids, (d['customer_id'] for d in deals)))
+        activities = []
+        for customer_id in customer_ids:
+            for i in range(skewed_count(rng, 6)):
+                deal_id = rng.choice(deal_ids) if deal_ids and rng.random() < 0.4 else None
+                owner = deal_customers[deal_id] if deal_id else customer_id
+                activities.append(activity_row(rng, f'{customer_id}-{i}', owner, deal_id, now))
+        activity_ids = bulk_create(client, token, 'activities', activities)
+        users.append({'username': username, 'token': token, 'weight': weight, 'customers': customer_ids,
+                      'contacts': contact_ids, 'deals': deal_ids, 'activities': activity_ids})
+        counts['users'] += 1
+        for key, ids in (('customers', customer_ids), ('contacts', contact_ids), ('deals', deal_ids), ('activities', activity_ids)):
+            counts[key] += len(ids)
+    return users, counts
+
+
+# Scenarios: each returns n requests as (method, path, json body, token)
+def pick_user(rng, users, resource='customers'):
+    candidates = [u for u in users if u[resource]]
+    return rng.choices(candidates, [u['weight'] for u in candidates])[0]
+
+
+def list_scenario(path, resource=None, param=None):
+    def build(client, rng, users, n):
+        requests = []
+        for _ in range(n):
+            user = pick_user(rng, users)
+            query = f'{path}?limit=100'
+            if param:
+                query += f'&{param}={rng.choice(user[resource])}'
+            requests.append(('GET', query, None, user['token']))
+        return requests
+    return build
+
+
+def create_scenario(resource, body):
+    def build(client, rng, users, n):
+        requests = []
+        for i in range(n):
+            user = pick_user(rng, users)
+            requests.append(('POST', f'/api/{resource}', body(rng, user, i), user['token']))
+        return requests
+    return build
+
+
+def update_scenario(resource, body):
+    def build(client, rng, users, n):
+        requests = []
+        for i in range(n):
+            user = pick_user(rng, users, resource)
+            requests.append(('PUT', f'/api/{resource}/{rng.choice(user[resource])}', body(rng, i), user['token']))
+        return requests
+    return build
+
+
+def delete_scenario(resource, body):
+    # Deletes consume rows, so fresh ones are created first, outside the timing
+    def build(client, rng, users, n):
+        requests = []
+        for user in users:
+            share = n // len(users) + (1 if len(requests) < n % len(users) else 0)
+            if share and user['customers']:
+                ids = bulk_create(client, user['token'], resource, [body(rng, user, i) for i in range(share)])
+                requests += [('DELETE', f'/api/{resource}/{row_id}', None, user['token']) for row_id in ids]
+        return requests[:n]
+    return build
+
+
+def per_user_scenario(path):
+    def build(client, rng, users, n):
+        requests = []
+        for _ in range(n):
+            user = pick_user(rng, users)
+            requests.append(('GET', path(rng, user), None, user['token']))
+        return requests
+    return build
+
+
+def batch_scenario(paths):
+    def build(client, rng, users, n):
+        return [('POST', '/api/batch', {'requests': paths}, pick_user(rng, users)['token']) for _ in range(n)]
+    return build
+
+
+def login_scenario(client, rng, users, n):
+    # Password hashing dominates; a handful of requests is representative
+    return [('POST', '/api/auth/login', {'username': user['username'], 'password': PASSWORD}, None)
+            for user in rng.choices(users, k=min(n, 20))]
+
+
+def new_customer(rng, user, i):
+    return customer_row(rng, f'new-{i}')
+
+
+def new_contact(rng, user, i):
+    return contact_row(rng, f'new-{i}', rng.choice(user['customers']))
+
+
+def new_deal(rng, user, i):
+    return deal_row(rng, f'new-{i}', rng.choice(user['customers']), datetime.utcnow().date())
+
+
+def new_activity(rng, user, i):
+    return activity_row(rng, f'new-{i}', rng.choice(user['customers']), None, datetime.utcnow())
+
+
+SCENARIOS = {
+    'login': login_scenario,
+    'customers.list': list_scenario('/api/customers'),
+    'customers.create': create_scenario('customers', new_customer),
+    'customers.update': update_scenario('customers', lambda rng, i: {'name': f'Renamed {i}', 'status': 'active'}),
+    'customers.delete': delete_scenario('customers', new_customer),
+    'customers.overview': per_user_scenario(lambda rng, user: f'/api/customers/{rng.choice(user["customers"])}/overview'),
+    'contacts.list': list_scenario('/api/contacts', 'customers', 'customer_id'),
+    'contacts.create': create_scenario('contacts', new_contact),
+    'contacts.update': update_scenario('contacts', lambda rng, i: {'position': rng.choice(['CEO', 'CTO', 'Buyer'])}),
+    'contacts.delete': delete_scenario('contacts', new_contact),
+    'deals.list': list_scenario('/api/deals'),
+    'deals.create': create_scenario('deals', new_deal),
+    'deals.update': update_scenario('deals', lambda rng, i: {'stage': rng.choices(STAGES, STAGE_WEIGHTS)[0]}),
+    'deals.delete': delete_scenario('deals', new_deal),
+    'activities.list': list_scenario('/api/activities', 'customers', 'customer_id'),
+    'activities.create': create_scenario('activities', new_activity),
+    'activities.update': update_scenario('activities', lambda rng, i: {'completed': True}),
+    'activities.delete': delete_scenario('activities', new_activity),
+    'dashboard.stats': per_user_scenario(lambda rng, user: '/api/dashboard/stats'),
+    'lookup.customers': per_user_scenario(lambda rng, user: '/api/lookup/customers'),
+    'search.typeahead': per_user_scenario(lambda rng, user: f'/api/search?mode=typeahead&q=Cust{rng.randrange(10)}'),
+    'sync.full': per_user_scenario(lambda rng, user: '/api/sync'),
+    'batch.startup': batch_scenario(['/api/customers?limit=100', '/api/deals?limit=100', '/api/activities?limit=100', '/api/dashboard/stats']),
+}
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def summarize(latencies, queries, errors, elapsed):
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput_rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'queries_per_request': round(sum(queries) / len(queries), 2) if queries else None,
+    }
+
+
+def queries_from(header):
+    match = QUERIES.search(header or '')
+    return int(match.group(1)) if match else None
+
+
+def run_in_process(client, requests):
+    latencies, queries, errors = [], [], 0
+    started = time.perf_counter()
+    for method, path, body, token in requests:
+        start = time.perf_counter()
+        response = client.open(path, method=method, json=body, headers=auth(token) if token else {})
+        latencies.append(time.perf_counter() - start)
+        errors += response.status_code >= 400
+        count = queries_from(response.headers.get('Server-Timing'))
+        if count is not None:
+            queries.append(count)
+    return summarize(latencies, queries, errors, time.perf_counter() - started)
+
+
+def http_client(port, requests, go, results):
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    latencies, queries, errors = [], [], 0
+    go.wait()
+    for method, path, body, token in requests:
+        headers = auth(token) if token else {}
+        payload = None
+        if body is not None:
+            payload = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        start = time.perf_counter()
+        try:
+            conn.request(method, path, body=payload, headers=headers)
+            response = conn.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', port)
+            continue
+        latencies.append(time.perf_counter() - start)
+        errors += response.status >= 400
+        count = queries_from(response.getheader('Server-Timing'))
+        if count is not None:
+            queries.append(count)
+    results.put((latencies, queries, errors))
+
+
+def run_over_http(port, clients, requests):
+    go = multiprocessing.Event()
+    results = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=http_client, args=(port, requests[i::clients], go, results))
+             for i in range(clients)]
+    for proc in procs:
+        proc.start()
+    time.sleep(0.5)
+    started = time.perf_counter()
+    go.set()
+    latencies, queries, errors = [], [], 0
+    for _ in procs:
+        client_latencies, client_queries, client_errors = results.get()
+        latencies += client_latencies
+        queries += client_queries
+        errors += client_errors
+    elapsed = time.perf_counter() - started
+    for proc in procs:
+        proc.join()
+    return summarize(latencies, queries, errors, elapsed)
+
+
+def start_server(port):
+    env = dict(os.environ, PORT=str(port), GUNICORN_ACCESS_LOG='')
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'],
+                              cwd=BACKEND, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/health')
+            if conn.getresponse().status == 200:
+                return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError(f'gunicorn on port {port} did not start')
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results):
+    print(f'{"scenario":<20} {"mode":<8} {"req/s":>9} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"queries":>8} {"errors":>7}')
+    for mode, scenarios in results.items():
+        for name, r in scenarios.items():
+            queries = '-' if r['queries_per_request'] is None else f'{r["queries_per_request"]:.1f}'
+            print(f'{name:<20} {mode:<8} {r["throughput_rps"]:>9,.1f} {r["p50_ms"]:>8.2f} {r["p95_ms"]:>8.2f} '
+                  f'{r["p99_ms"]:>8.2f} {queries:>8} {r["errors"]:>7}')
+
+
+def print_comparison(results, baseline):
+    print(f'\nChange against {baseline["meta"].get("commit")} (negative latency change is faster)')
+    print(f'{"scenario":<20} {"mode":<8} {"req/s":>9} {"p50":>8} {"p99":>8} {"queries":>8}')
+    for mode, scenarios in results.items():
+        for name, r in scenarios.items():
+            old = baseline['results'].get(mode, {}).get(name)
+            if not old:
+                continue
+
+            def change(key):
+                return f'{(r[key] - old[key]) / old[key] * 100:+.0f}%' if old[key] else 'n/a'
+
+            queries = '-'
+            if r['queries_per_request'] is not None and old['queries_per_request'] is not None:
+                queries = f'{r["queries_per_request"] - old["queries_per_request"]:+.1f}'
+            print(f'{name:<20} {mode:<8} {change("throughput_rps"):>9} {change("p50_ms"):>8} {change("p99_ms"):>8} {queries:>8}')
+
+
+def main():
+    args = parse_args()
+    rng = random.Random(args.seed)
+
+    from app import create_app, db, init_db
+    app = create_app()
+    with app.app_context():
+        init_db()
+        dialect = db.engine.dialect.name
+    client = app.test_client()
+
+    started = time.perf_counter()
+    users, counts = seed(client, args, rng)
+    print(f'Seeded {counts} on {dialect} in {time.perf_counter() - started:.1f}s')
+
+    plans = {name: build(client, rng, users, args.requests) for name, build in SCENARIOS.items()}
+    results = {'inprocess': {name: run_in_process(client, requests) for name, requests in plans.items()}}
+    if args.http:
+        # Fresh plans, so writes and deletes target rows that still exist
+        plans = {name: build(client, rng, users, args.requests) for name, build in SCENARIOS.items()}
+        server = start_server(args.port)
+        try:
+            results['http'] = {name: run_over_http(args.port, args.clients, requests) for name, requests in plans.items()}
+        finally:
+            server.terminate()
+            server.wait()
+
+    print_results(results)
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+            'database': dialect,
+            'python': platform.python_version(),
+            'cpus': os.cpu_count(),
+            'seed': args.seed,
+            'requests_per_scenario': args.requests,
+            'http_clients': args.clients if args.http else None,
+            'dataset': counts,
+        },
+        'results': results,
+    }
+    output = args.output or os.path.join(BACKEND, 'benchmarks', 'results', f'{report["meta"]["commit"] or "local"}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'\nWrote {output}')
+
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(results, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+"""Time the SPA's startup fan-out with and without /api/batch.
+
+Usage: python benchmarks/bench_batch.py [page_loads] [rtt_ms]
+
+A gunicorn server (gunicorn.conf.py) is started on a seeded SQLite database
+and one page load is simulated several ways: the four startup GETs one
+after another, the four at once on separate connections as a browser sends
+them, and a single batch, run in order or with "parallel". Every request
+is cross-origin with an Authorization header, so it is preceded by a CORS
+preflight, as in the browser. Localhost has no network latency; rtt_ms
+adds a modeled round-trip time per request on the critical path.
+"""
+import http.client
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+LOADS = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+RTT_MS = float(sys.argv[2]) if len(sys.argv) > 2 else 50
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PORT = 5103
+ORIGIN = 'http://localhost:3000'
+STARTUP = ['/api/customers?limit=100', '/api/deals?limit=100', '/api/activities?limit=100', '/api/dashboard/stats']
+
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+sys.path.insert(0, BACKEND)
+
+
+def seed():
+    from app import create_app, init_db
+    app = create_app()
+    with app.app_context():
+        init_db()
+    client = app.test_client()
+    token = client.post('/api/auth/login', json={'username': 'admin', 'password': 'admin123'}).get_json()['access_token']
+    headers = {'Authorization': f'Bearer {token}'}
+    client.post('/api/customers/bulk', headers=headers, json=[{'name': f'Customer {i}', 'company': 'Acme'} for i in range(2000)])
+    client.post('/api/deals/bulk', headers=headers, json=[
+        {'title': f'Deal {i}', 'value': 1000 + i, 'stage': 'proposal', 'customer_id': i % 2000 + 1} for i in range(2000)
+    ])
+    client.post('/api/activities/bulk', headers=headers, json=[
+        {'type': 'call', 'subject': f'Call {i}', 'customer_id': i % 2000 + 1} for i in range(2000)
+    ])
+    return token
+
+
+def wait_ready():
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', PORT, timeout=1)
+            conn.request('GET', '/health')
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError('gunicorn did not start')
+
+
+class Browser:
+    # One keep-alive connection; every call is a preflight plus the request
+    def __init__(self, token):
+        self.conn = http.client.HTTPConnection('127.0.0.1', PORT)
+        self.token = token
+
+    def call(self, method, path, body=None):
+        try:
+            return self.send(method, path, body)
+        except (http.client.RemoteDisconnected, ConnectionError):
+            # Idle keep-alive connections and recycled workers get closed;
+            # reconnect as a browser would
+            self.conn.close()
+            self.conn = http.client.HTTPConnection('127.0.0.1', PORT)
+            return self.send(method, path, body)
+
+    def send(self, method, path, body):
+        self.conn.request('OPTIONS', path, headers={
+            'Origin': ORIGIN,
+            'Access-Control-Request-Method': method,
+            'Access-Control-Request-Headers': 'authorization,content-type',
+        })
+        self.conn.getresponse().read()
+        headers = {'Origin': ORIGIN, 'Authorization': f'Bearer {self.token}', 'Content-Type': 'application/json'}
+        self.conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+        response = self.conn.getresponse()
+        data = response.read()
+        assert response.status == 200, (path, response.status, data[:200])
+        return data
+
+
+def timed(load, browsers):
+    times = []
+    for _ in range(LOADS):
+        start = time.perf_counter()
+        load(browsers)
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def sequential(browsers):
+    for path in STARTUP:
+        browsers[0].call('GET', path)
+
+
+def concurrent(browsers, pool=ThreadPoolExecutor(max_workers=len(STARTUP))):
+    list(pool.map(lambda pair: pair[0].call('GET', pair[1]), zip(browsers, STARTUP)))
+
+
+def batched(parallel):
+    def load(browsers):
+        data = json.loads(browsers[0].call('POST', '/api/batch', {'requests': STARTUP, 'parallel': parallel}))
+        assert all(r['status'] == 200 for r in data['responses']), data
+    return load
+
+
+if __name__ == '__main__':
+    token = seed()
+    env = dict(os.environ, PORT=str(PORT), GUNICORN_ACCESS_LOG='')
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'],
+                              cwd=BACKEND, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_ready()
+        browsers = [Browser(token) for _ in STARTUP]
+        # name -> (load, HTTP requests, round trips on the critical path)
+        scenarios = {
+            '4 GETs, one by one': (sequential, 2 * len(STARTUP), 2 * len(STARTUP)),
+            '4 GETs, concurrent': (concurrent, 2 * len(STARTUP), 2),
+            'batch': (batched(False), 2, 2),
+            'batch, parallel': (batched(True), 2, 2),
+        }
+        for load, _, _ in scenarios.values():
+            timed(load, browsers)  # warm up
+        print(f'{LOADS} page loads each, {os.cpu_count()} CPUs; modeled RTT {RTT_MS:.0f} ms')
+        print(f'{"":<22} {"HTTP requests":>13} {"p50 ms":>8} {"p95 ms":>8} {"p50 + RTT":>10}')
+        for name, (load, requests, round_trips) in scenarios.items():
+            times = sorted(timed(load, browsers))
+            p50 = statistics.median(times)
+            p95 = times[int(len(times) * 0.95)]
+            print(f'{name:<22} {requests:>13} {p50:>8.1f} {p95:>8.1f} {p50 + round_trips * RTT_MS:>10.1f}')
+    finally:
+        server.terminate()
+        server.wait()
@@ -0,0 +1,42 @@
+"""Compare per-row POSTs with the bulk endpoint.
+
+Usage: python benchmarks/bench_bulk.py [rows]
+
+Runs against a throwaway SQLite database through the Flask test client, so the
+numbers measure application and database cost without network overhead.
+"""
+import os
+import sys
+import tempfile
+import time
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, init_db  # noqa: E402
+
+
+if __name__ == '__main__':
+    app = create_app()
+    with app.app_context():
+        init_db()
+    client = app.test_client()
+    token = client.post('/api/auth/login', json={'username': 'admin', 'password': 'admin123'}).get_json()['access_token']
+    headers = {'Authorization': f'Bearer {token}'}
+    customers = [{'name': f'Customer {i}', 'email': f'c{i}@example.com', 'company': 'Acme'} for i in range(ROWS)]
+
+    start = time.perf_counter()
+    for customer in customers:
+        client.post('/api/customers', json=customer, headers=headers)
+    per_row = time.perf_counter() - start
+
+    start = time.perf_counter()
+    client.post('/api/customers/bulk', json=customers, headers=headers)
+    bulk = time.perf_counter() - start
+
+    print(f'{ROWS} customers')
+    print(f'per-row POST: {per_row:.2f}s ({ROWS / per_row:,.0f} rows/s)')
+    print(f'bulk POST:    {bulk:.2f}s ({ROWS / bulk:,.0f} rows/s)')
+    print(f'speedup:      {per_row / bulk:.1f}x')
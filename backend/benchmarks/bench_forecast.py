@@ -0,0 +1,88 @@
+"""Time /api/analytics/forecast for one user with a million deals.
+
+Usage: python benchmarks/bench_forecast.py [deals] [budget_seconds]
+
+Deals are inserted straight into a throwaway SQLite database (or
+DATABASE_URL) with a realistic stage mix and close dates spread over three
+years. "before" is the baseline: loading every deal through the ORM on
+each request and aggregating row by row in Python. "after" is the
+endpoint's grouped SQL query. The script fails if the endpoint's median
+exceeds the budget.
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+DEALS = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+BUDGET = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+STAGES = ['prospecting', 'qualification', 'proposal', 'negotiation', 'closed-won', 'closed-lost']
+
+os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db'))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import Customer, Deal, create_app, db, init_db  # noqa: E402
+
+rng = random.Random(42)
+
+
+def insert_deals():
+    customer = Customer(name='Bench', user_id=1)
+    db.session.add(customer)
+    db.session.flush()
+    now = datetime.utcnow()
+    for offset in range(0, DEALS, 50_000):
+        db.session.execute(db.insert(Deal), [{
+            'title': f'Deal {i}',
+            'value': round(rng.lognormvariate(9, 1.2), 2),
+            'stage': rng.choices(STAGES, [35, 25, 15, 10, 10, 5])[0],
+            'probability': rng.randrange(0, 101, 10),
+            'expected_close_date': date.today() + timedelta(days=rng.randint(-365, 730)),
+            'customer_id': customer.id,
+            'created_at': now - timedelta(days=rng.uniform(0, 365)),
+            'updated_at': now,
+            'user_id': 1,
+        } for i in range(offset, min(offset + 50_000, DEALS))])
+    db.session.commit()
+
+
+def python_totals():
+    totals = {}
+    for deal in Deal.query.filter_by(user_id=1).yield_per(10_000):
+        key = (deal.stage, deal.expected_close_date.strftime('%Y-%m') if deal.expected_close_date else None)
+        count, value, weighted = totals.get(key, (0, 0.0, 0.0))
+        totals[key] = (count + 1, value + deal.value, weighted + deal.value * (deal.probability or 0) / 100)
+    db.session.expunge_all()
+    return totals
+
+
+if __name__ == '__main__':
+    app = create_app()
+    with app.app_context():
+        init_db()
+        start = time.perf_counter()
+        insert_deals()
+        print(f'Inserted {DEALS:,} deals in {time.perf_counter() - start:.1f}s')
+
+        start = time.perf_counter()
+        python_totals()
+        before = time.perf_counter() - start
+
+    client = app.test_client()
+    token = client.post('/api/auth/login', json={'username': 'admin', 'password': 'admin123'}).get_json()['access_token']
+    headers = {'Authorization': f'Bearer {token}'}
+    times = []
+    for period in ('month', 'quarter', 'month', 'quarter', 'month'):
+        start = time.perf_counter()
+        response = client.get(f'/api/analytics/forecast?period={period}&months=24', headers=headers)
+        times.append(time.perf_counter() - start)
+        assert response.status_code == 200, response.get_data(as_text=True)
+
+    print(f'before (ORM rows, Python loop): {before:.2f}s')
+    print(f'after  (grouped SQL):           median {statistics.median(times):.2f}s   max {max(times):.2f}s')
+    if statistics.median(times) > BUDGET:
+        raise SystemExit(f'forecast median {statistics.median(times):.2f}s exceeds the {BUDGET:.1f}s budget')
+    print(f'within the {BUDGET:.1f}s budget')
@@ -0,0 +1,151 @@
+"""Measure CRUD latency while a storm of logins hits the same server.
+
+Usage: python benchmarks/bench_login_storm.py [seconds] [crud_clients] [login_clients]
+
+gunicorn (gunicorn.conf.py) serves a seeded SQLite database. CRUD clients
+alternate a 50-row customers page and a customer update while login
+clients sign in as fast as they can. Three runs are compared: no logins,
+logins hashed inline on the request threads (PASSWORD_HASH_WORKERS=0),
+and logins hashed on the process pool. Logins turned away with 503 are
+counted, not retried.
+"""
+import http.client
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+SECONDS = float(sys.argv[1]) if len(sys.argv) > 1 else 15
+CRUD_CLIENTS = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+LOGIN_CLIENTS = int(sys.argv[3]) if len(sys.argv) > 3 else 16
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PORT = 5104
+CUSTOMERS = 500
+
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+sys.path.insert(0, BACKEND)
+
+
+def seed():
+    os.environ['PASSWORD_HASH_WORKERS'] = '0'
+    from app import create_app, init_db
+    app = create_app()
+    with app.app_context():
+        init_db()
+    client = app.test_client()
+    token = client.post('/api/auth/login', json={'username': 'admin', 'password': 'admin123'}).get_json()['access_token']
+    headers = {'Authorization': f'Bearer {token}'}
+    client.post('/api/customers/bulk', headers=headers, json=[{'name': f'Customer {i}'} for i in range(CUSTOMERS)])
+    del os.environ['PASSWORD_HASH_WORKERS']
+    return token
+
+
+def wait_ready():
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', PORT, timeout=1)
+            conn.request('GET', '/health')
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError('gunicorn did not start')
+
+
+def request(conn, method, path, body, headers):
+    try:
+        conn.request(method, path, body=body, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        return conn, response.status
+    except (OSError, http.client.HTTPException):
+        conn.close()
+        return http.client.HTTPConnection('127.0.0.1', PORT), None
+
+
+def crud_client(token, deadline, results):
+    conn = http.client.HTTPConnection('127.0.0.1', PORT)
+    headers = {'Authorization': f'Bearer {token}', 'Content-Type': 'application/json'}
+    latencies, errors, i = [], 0, 0
+    while time.monotonic() < deadline:
+        i += 1
+        if i % 2:
+            method, path, body = 'GET', '/api/customers?limit=50', None
+        else:
+            method, path, body = 'PUT', f'/api/customers/{i % CUSTOMERS + 1}', json.dumps({'status': 'active'})
+        start = time.perf_counter()
+        conn, status = request(conn, method, path, body, headers)
+        if status != 200:
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - start)
+    results.put(('crud', latencies, errors))
+
+
+def login_client(deadline, results):
+    conn = http.client.HTTPConnection('127.0.0.1', PORT)
+    body = json.dumps({'username': 'admin', 'password': 'admin123'})
+    ok, busy, errors = 0, 0, 0
+    while time.monotonic() < deadline:
+        conn, status = request(conn, 'POST', '/api/auth/login', body, {'Content-Type': 'application/json'})
+        if status == 200:
+            ok += 1
+        elif status == 503:
+            busy += 1
+            time.sleep(0.05)
+        else:
+            errors += 1
+    results.put(('login', (ok, busy), errors))
+
+
+def run(name, token, login_clients, hash_workers):
+    env = dict(os.environ, PORT=str(PORT), GUNICORN_ACCESS_LOG='')
+    if hash_workers is not None:
+        env['PASSWORD_HASH_WORKERS'] = str(hash_workers)
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'],
+                              cwd=BACKEND, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_ready()
+        # Start the hashing pools before timing
+        for _ in range(8):
+            request(http.client.HTTPConnection('127.0.0.1', PORT), 'POST', '/api/auth/login',
+                    json.dumps({'username': 'admin', 'password': 'admin123'}), {'Content-Type': 'application/json'})
+        results = multiprocessing.Queue()
+        deadline = time.monotonic() + SECONDS
+        procs = [multiprocessing.Process(target=crud_client, args=(token, deadline, results)) for _ in range(CRUD_CLIENTS)]
+        procs += [multiprocessing.Process(target=login_client, args=(deadline, results)) for _ in range(login_clients)]
+        for proc in procs:
+            proc.start()
+        latencies, crud_errors, logins, busy, login_errors = [], 0, 0, 0, 0
+        for _ in procs:
+            kind, data, errors = results.get()
+            if kind == 'crud':
+                latencies += data
+                crud_errors += errors
+            else:
+                logins += data[0]
+                busy += data[1]
+                login_errors += errors
+        for proc in procs:
+            proc.join()
+    finally:
+        server.terminate()
+        server.wait()
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[int(len(latencies) * 0.99)] * 1000
+    print(f'{name:<18} CRUD {len(latencies) / SECONDS:>7,.0f} req/s   p50 {p50:6.1f} ms   p99 {p99:7.1f} ms   errors {crud_errors}'
+          f'   | logins {logins / SECONDS:>5,.1f}/s   503s {busy}   errors {login_errors}')
+
+
+if __name__ == '__main__':
+    token = seed()
+    print(f'{CRUD_CLIENTS} CRUD clients, {LOGIN_CLIENTS} login clients, {SECONDS:.0f}s per run, {os.cpu_count()} CPUs')
+    run('no logins', token, 0, None)
+    run('inline hashing', token, LOGIN_CLIENTS, 0)
+    run('hashing pool', token, LOGIN_CLIENTS, None)
@@ -0,0 +1,98 @@
+"""Time one reminder tick as the activity table grows.
+
+Usage: python benchmarks/bench_reminders.py [due_soon] [sizes...]
+
+For each table size, activities are inserted straight into a throwaway
+SQLite database (or DATABASE_URL): due_soon open ones due within the next
+few minutes, the rest completed or due weeks ahead, as in a long-lived
+account. "poll" is what the request asked us to avoid: reading every open
+activity each tick and checking its due time in Python. "window" is the
+scheduler's refresh query plus popping the heap, which should stay flat as
+the table grows.
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+DUE_SOON = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+SIZES = [int(n) for n in sys.argv[2:]] or [100_000, 1_000_000]
+
+os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db'))
+os.environ['PASSWORD_HASH_WORKERS'] = '0'
+os.environ['REMINDER_SCHEDULER'] = 'false'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as crm  # noqa: E402
+from app import Activity, create_app, db, init_db  # noqa: E402
+
+app = create_app()
+rng = random.Random(42)
+
+
+def insert(count, now, due_soon):
+    # The first due_soon rows come due in the next ten minutes; every later
+    # one is completed or due weeks ahead
+    for offset in range(0, count, 50_000):
+        rows = []
+        for i in range(offset, min(offset + 50_000, count)):
+            if i < due_soon:
+                due, completed = now + timedelta(seconds=rng.uniform(0, 600)), False
+            elif i % 4:
+                due, completed = now - timedelta(days=rng.uniform(1, 700)), True
+            else:
+                due, completed = now + timedelta(days=rng.uniform(7, 365)), False
+            rows.append({'type': 'call', 'subject': f'Call {i}', 'due_date': due, 'completed': completed,
+                         'created_at': now, 'updated_at': now, 'user_id': 1 + i % 50})
+        db.session.execute(db.insert(Activity), rows)
+    db.session.commit()
+
+
+def poll(now):
+    horizon = now + timedelta(minutes=crm.REMINDER_LEAD_MINUTES)
+    rows = db.session.execute(db.select(Activity.id, Activity.due_date).where(Activity.completed.is_(False))).all()
+    due = [activity_id for activity_id, due_date in rows if due_date and due_date <= horizon]
+    db.session.rollback()
+    return len(due)
+
+
+def window(now):
+    crm.reminder_heap.clear()
+    crm.reminder_due.clear()
+    crm.reminder_state['loaded_until'] = now - timedelta(minutes=crm.REMINDER_CATCH_UP_MINUTES)
+    crm.load_reminder_window(now)
+    loaded = len(crm.reminder_due)
+    # Pop what would fire over the next ten minutes without writing events
+    while crm.reminder_heap and crm.reminder_heap[0][0] <= now + timedelta(minutes=10):
+        crm.heapq.heappop(crm.reminder_heap)
+    return loaded
+
+
+def timed(fn, now):
+    times, result = [], None
+    for _ in range(5):
+        start = time.perf_counter()
+        result = fn(now)
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times), result
+
+
+if __name__ == '__main__':
+    with app.app_context():
+        init_db()
+        db.session.execute(db.insert(crm.User), [
+            {'username': f'bench{n}', 'email': f'bench{n}@example.com', 'password_hash': '-'} for n in range(2, 51)
+        ])
+        db.session.commit()
+        now = datetime.utcnow()
+        inserted = 0
+        print(f'{"activities":>12} {"poll ms":>9} {"window ms":>10} {"loaded":>8}')
+        for size in SIZES:
+            insert(size - inserted, now, DUE_SOON if not inserted else 0)
+            inserted = size
+            poll_ms, _ = timed(poll, now)
+            window_ms, loaded = timed(window, now)
+            print(f'{size:>12,} {poll_ms:>9.1f} {window_ms:>10.1f} {loaded:>8,}')
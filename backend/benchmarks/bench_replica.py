@@ -0,0 +1,148 @@
+"""Check read-replica routing under a mixed load.
+
+Usage: python benchmarks/bench_replica.py [seconds] [clients] [lag_seconds] [reads_per_write]
+
+gunicorn (gunicorn.conf.py) serves a seeded SQLite primary with a second
+SQLite file as DATABASE_REPLICA_URLS. A replicator thread copies the primary
+over the replica every lag_seconds, standing in for streaming replication.
+Each client loops: update one of its customers' names, immediately list
+customers and check the new name is there, then keep listing until it has
+made reads_per_write reads. A read that misses the client's own write is
+counted as stale; there should be none. The share of reads served by the
+replica comes from /metrics.
+"""
+import http.client
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+SECONDS = float(sys.argv[1]) if len(sys.argv) > 1 else 15
+CLIENTS = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+LAG = float(sys.argv[3]) if len(sys.argv) > 3 else 1
+READS_PER_WRITE = int(sys.argv[4]) if len(sys.argv) > 4 else 50
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PORT = 5105
+DATA = tempfile.mkdtemp()
+PRIMARY, REPLICA = os.path.join(DATA, 'primary.db'), os.path.join(DATA, 'replica.db')
+
+os.environ['DATABASE_URL'] = 'sqlite:///' + PRIMARY
+sys.path.insert(0, BACKEND)
+
+
+def replicate():
+    source, target = sqlite3.connect(PRIMARY), sqlite3.connect(REPLICA, timeout=30)
+    source.backup(target)
+    source.close()
+    target.close()
+
+
+def seed():
+    os.environ['PASSWORD_HASH_WORKERS'] = '0'
+    from app import create_app, init_db
+    app = create_app()
+    with app.app_context():
+        init_db()
+    client = app.test_client()
+    tokens = []
+    for n in range(CLIENTS):
+        client.post('/api/auth/register', json={'username': f'bench{n}', 'email': f'bench{n}@example.com', 'password': 'bench123'})
+        token = client.post('/api/auth/login', json={'username': f'bench{n}', 'password': 'bench123'}).get_json()['access_token']
+        client.post('/api/customers/bulk', headers={'Authorization': f'Bearer {token}'},
+                    json=[{'name': f'Customer {i}'} for i in range(200)])
+        tokens.append(token)
+    del os.environ['PASSWORD_HASH_WORKERS']
+    replicate()
+    return tokens
+
+
+def wait_ready():
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', PORT, timeout=1)
+            conn.request('GET', '/health')
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError('gunicorn did not start')
+
+
+def call(conn, method, path, token, body=None):
+    headers = {'Authorization': f'Bearer {token}', 'Content-Type': 'application/json'}
+    conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+    response = conn.getresponse()
+    data = response.read()
+    assert response.status == 200, (path, response.status, data[:200])
+    return json.loads(data)
+
+
+def client(token, deadline, results):
+    conn = http.client.HTTPConnection('127.0.0.1', PORT)
+    customer_id = call(conn, 'GET', '/api/customers?limit=1', token)['items'][0]['id']
+    reads, stale, i = 0, 0, 0
+    while time.monotonic() < deadline:
+        i += 1
+        name = f'Renamed {i}'
+        call(conn, 'PUT', f'/api/customers/{customer_id}', token, {'name': name})
+        for n in range(READS_PER_WRITE):
+            items = call(conn, 'GET', '/api/customers?limit=500&fields=id,name', token)['items']
+            reads += 1
+            if n == 0 and {'id': customer_id, 'name': name} not in items:
+                stale += 1
+    results.append((reads, stale))
+
+
+def replicator(deadline):
+    while time.monotonic() < deadline:
+        time.sleep(LAG)
+        replicate()
+
+
+def replica_reads():
+    conn = http.client.HTTPConnection('127.0.0.1', PORT)
+    conn.request('GET', '/metrics')
+    counts = {}
+    for line in conn.getresponse().read().decode().splitlines():
+        if line.startswith('crm_replica_reads_total{'):
+            labels, value = line.rsplit(' ', 1)
+            counts[labels[len('crm_replica_reads_total'):]] = float(value)
+    return counts
+
+
+if __name__ == '__main__':
+    tokens = seed()
+    metrics_dir = tempfile.mkdtemp()
+    env = dict(os.environ, PORT=str(PORT), GUNICORN_ACCESS_LOG='', DATABASE_REPLICA_URLS='sqlite:///' + REPLICA,
+               PROMETHEUS_MULTIPROC_DIR=metrics_dir, REMINDER_SCHEDULER='false')
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'],
+                              cwd=BACKEND, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_ready()
+        deadline = time.monotonic() + SECONDS
+        results = []
+        threads = [threading.Thread(target=client, args=(token, deadline, results)) for token in tokens]
+        threads.append(threading.Thread(target=replicator, args=(deadline,)))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        counts = replica_reads()
+    finally:
+        server.terminate()
+        server.wait()
+
+    reads = sum(r for r, _ in results)
+    stale = sum(s for _, s in results)
+    print(f'{CLIENTS} clients, {READS_PER_WRITE} reads per write, {SECONDS:.0f}s, replica refreshed every {LAG:g}s, {os.cpu_count()} CPUs')
+    print(f'list reads: {reads:,}   stale reads of own writes: {stale}')
+    total = sum(counts.values()) or 1
+    for labels, value in sorted(counts.items()):
+        print(f'  {labels:<42} {value:>8,.0f}  {value / total:6.1%}')
+    if stale:
+        raise SystemExit('read-your-writes violated')
@@ -0,0 +1,70 @@
+"""Per-row cost of serializing a 10k-row list response.
+
+Usage: python benchmarks/bench_serialization.py [rows]
+
+"before" is the original per-route code path: a dict literal per row with an
+.isoformat() call per timestamp, encoded by Flask's default provider
+(stdlib json, sorted keys). "after" is the shared serializer layer: dict(zip())
+over column-SELECT row tuples, encoded by FastJSONProvider.
+"""
+import json
+import os
+import sys
+import timeit
+from datetime import datetime
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as crm  # noqa: E402
+
+now = datetime.utcnow()
+rows = [
+    (i, f'Customer {i}', f'c{i}@example.com', '555-0100', 'Acme', 'Software', 'active', None, now, now)
+    for i in range(ROWS)
+]
+
+
+class Obj:
+    __slots__ = crm.CUSTOMER_FIELDS
+
+    def __init__(self, row):
+        for field, value in zip(crm.CUSTOMER_FIELDS, row):
+            setattr(self, field, value)
+
+
+objects = [Obj(row) for row in rows]
+
+
+def before():
+    return json.dumps([{
+        'id': c.id,
+        'name': c.name,
+        'email': c.email,
+        'phone': c.phone,
+        'company': c.company,
+        'industry': c.industry,
+        'status': c.status,
+        'created_at': c.created_at.isoformat(),
+        'updated_at': c.updated_at.isoformat()
+    } for c in objects], sort_keys=True)
+
+
+def after():
+    return crm.dumps_json(crm.serialize_rows(crm.CUSTOMER_FIELDS, rows))
+
+
+def after_stdlib():
+    saved, crm.orjson = crm.orjson, None
+    try:
+        return after()
+    finally:
+        crm.orjson = saved
+
+
+for name, fn in [('before', before), ('after (stdlib json)', after_stdlib), ('after', after)]:
+    best = min(timeit.repeat(fn, number=5, repeat=5)) / 5
+    print(f'{name:<20} {best * 1000:8.2f} ms per response  {best / ROWS * 1e6:6.2f} us per row')
+if not crm.orjson:
+    print('orjson is not installed; "after" used the stdlib fallback')
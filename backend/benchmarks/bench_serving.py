@@ -0,0 +1,112 @@
+"""Compare the Werkzeug dev server with gunicorn under concurrent load.
+
+Usage: python benchmarks/bench_serving.py [seconds] [clients]
+
+Both servers run on this machine against the same seeded SQLite database and
+are driven by the same keep-alive HTTP clients, one process each, requesting
+a 50-row customers page. gunicorn uses gunicorn.conf.py, so WEB_CONCURRENCY
+and GUNICORN_THREADS apply.
+"""
+import http.client
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+SECONDS = float(sys.argv[1]) if len(sys.argv) > 1 else 10
+CLIENTS = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PATH = '/api/customers?limit=50'
+
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+sys.path.insert(0, BACKEND)
+
+
+def seed():
+    from app import create_app, init_db
+    app = create_app()
+    with app.app_context():
+        init_db()
+    client = app.test_client()
+    token = client.post('/api/auth/login', json={'username': 'admin', 'password': 'admin123'}).get_json()['access_token']
+    headers = {'Authorization': f'Bearer {token}'}
+    client.post('/api/customers/bulk', headers=headers, json=[
+        {'name': f'Customer {i}', 'email': f'c{i}@example.com', 'company': 'Acme'} for i in range(5000)
+    ])
+    return token
+
+
+def wait_ready(port):
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/health')
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'server on port {port} did not start')
+
+
+def client(port, token, deadline, results):
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    headers = {'Authorization': f'Bearer {token}'}
+    latencies = []
+    errors = 0
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        try:
+            conn.request('GET', PATH, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', port)
+            continue
+        latencies.append(time.perf_counter() - start)
+    results.put((latencies, errors))
+
+
+def run(name, command, port, token):
+    env = dict(os.environ, PORT=str(port), GUNICORN_ACCESS_LOG='')
+    server = subprocess.Popen(command, cwd=BACKEND, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_ready(port)
+        results = multiprocessing.Queue()
+        deadline = time.monotonic() + SECONDS
+        procs = [multiprocessing.Process(target=client, args=(port, token, deadline, results)) for _ in range(CLIENTS)]
+        for proc in procs:
+            proc.start()
+        latencies, errors = [], 0
+        for _ in procs:
+            client_latencies, client_errors = results.get()
+            latencies += client_latencies
+            errors += client_errors
+        for proc in procs:
+            proc.join()
+    finally:
+        server.terminate()
+        server.wait()
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[int(len(latencies) * 0.99)] * 1000
+    print(f'{name:<10} {len(latencies) / SECONDS:>8,.0f} req/s   p50 {p50:6.1f} ms   p99 {p99:6.1f} ms   errors {errors}')
+    return {'requests_per_second': round(len(latencies) / SECONDS, 1), 'p50_ms': round(p50, 1), 'p99_ms': round(p99, 1), 'errors': errors}
+
+
+if __name__ == '__main__':
+    token = seed()
+    print(f'GET {PATH}, {CLIENTS} clients, {SECONDS:.0f}s each, {os.cpu_count()} CPUs')
+    results = {
+        'dev': run('dev', [sys.executable, 'app.py'], 5101, token),
+        'gunicorn': run('gunicorn', [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'], 5102, token),
+    }
+    print(json.dumps(results, indent=2))
@@ -0,0 +1,53 @@
+"""Time a cold worker boot and fail if it exceeds the startup budget.
+
+Usage: python benchmarks/bench_startup.py [runs] [budget_seconds]
+
+Each run is a fresh interpreter importing wsgi:app, as a gunicorn worker
+does. DATABASE_URL points into a directory that does not exist, so any
+database access during import fails the run outright. For comparison the
+old boot path (import, then init_db() against an existing database) is
+timed too.
+"""
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+RUNS = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+BUDGET = float(sys.argv[2]) if len(sys.argv) > 2 else 1.5
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BOOT = 'from wsgi import app'
+BOOT_WITH_INIT = 'from wsgi import app\nfrom app import init_db\nwith app.app_context():\n    init_db()'
+
+
+def boot_times(code, database_url):
+    env = dict(os.environ, DATABASE_URL=database_url)
+    times = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], cwd=BACKEND, env=env, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def report(name, times):
+    print(f'{name:<22} median {statistics.median(times):.3f}s   max {max(times):.3f}s')
+
+
+if __name__ == '__main__':
+    unreachable = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'missing', 'crm.db')
+    existing = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'crm.db')
+    subprocess.run([sys.executable, '-c', BOOT_WITH_INIT], cwd=BACKEND, check=True,
+                   env=dict(os.environ, DATABASE_URL=existing), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    boot = boot_times(BOOT, unreachable)
+    report('import (no DB)', boot)
+    report('import + init_db', boot_times(BOOT_WITH_INIT, existing))
+
+    if statistics.median(boot) > BUDGET:
+        raise SystemExit(f'worker boot median {statistics.median(boot):.3f}s exceeds the {BUDGET:.1f}s budget')
+    print(f'within the {BUDGET:.1f}s budget')
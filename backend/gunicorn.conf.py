@@ -0,0 +1,42 @@
+# Production server settings; every value can be overridden from the
+# environment. Run from backend/: gunicorn wsgi:app
+import os
+import shutil
+
+bind = f"0.0.0.0:{os.getenv('PORT', 5000)}"
+workers = int(os.getenv('WEB_CONCURRENCY', 2))
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+worker_class = 'gthread'
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 60))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+# Recycle workers now and then so slow leaks cannot build up; the jitter
+# keeps them from all restarting at once
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 10000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 1000))
+# Import the app once in the master so workers fork with it already loaded
+preload_app = True
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-') or None
+
+
+def post_fork(server, worker):
+    # Connections opened in the master before forking must not be shared;
+    # drop them from the child's pool without closing the parent's sockets
+    from app import db
+    from wsgi import app
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+
+def on_starting(server):
+    # Multiprocess metrics live in files that must not outlive the master
+    path = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path)
+
+
+def child_exit(server, worker):
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
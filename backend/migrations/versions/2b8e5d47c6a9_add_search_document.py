@@ -0,0 +1,72 @@
+"""add search_document and full-text index
+
+Revision ID: 2b8e5d47c6a9
+Revises: 9a6f3c18e2d0
+Create Date: 2026-10-18 16:44:58.390215
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2b8e5d47c6a9'
+down_revision = '9a6f3c18e2d0'
+branch_labels = None
+depends_on = None
+
+SEARCH_DDL = {
+    'postgresql': [
+        "CREATE EXTENSION IF NOT EXISTS btree_gin",
+        "ALTER TABLE search_document ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('simple', coalesce(label, '')), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(body, '')), 'B')) STORED",
+        "CREATE INDEX ix_search_document_vector ON search_document USING gin (user_id, search_vector)",
+    ],
+    'sqlite': [
+        "CREATE VIRTUAL TABLE search_fts USING fts5("
+        "user_key, label, body, resource UNINDEXED, row_id UNINDEXED, prefix='2 3')",
+        "CREATE TRIGGER search_document_ai AFTER INSERT ON search_document BEGIN "
+        "INSERT INTO search_fts (rowid, user_key, label, body, resource, row_id) "
+        "VALUES (new.id, 'u' || new.user_id, new.label, new.body, new.resource, new.row_id); END",
+        "CREATE TRIGGER search_document_ad AFTER DELETE ON search_document BEGIN "
+        "DELETE FROM search_fts WHERE rowid = old.id; END",
+        "CREATE TRIGGER search_document_au AFTER UPDATE ON search_document BEGIN "
+        "UPDATE search_fts SET user_key = 'u' || new.user_id, label = new.label, body = new.body, "
+        "resource = new.resource, row_id = new.row_id WHERE rowid = old.id; END",
+    ],
+}
+
+BACKFILL = [
+    "INSERT INTO search_document (resource, row_id, label, body, user_id) "
+    "SELECT 'customer', id, name, COALESCE(company, '') || ' ' || COALESCE(email, ''), user_id FROM customer",
+    "INSERT INTO search_document (resource, row_id, label, body, user_id) "
+    "SELECT 'contact', id, first_name || ' ' || last_name, COALESCE(email, ''), user_id FROM contact",
+    "INSERT INTO search_document (resource, row_id, label, body, user_id) "
+    "SELECT 'deal', id, title, '', user_id FROM deal",
+]
+
+
+def upgrade():
+    op.create_table('search_document',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('resource', sa.String(length=20), nullable=False),
+    sa.Column('row_id', sa.Integer(), nullable=False),
+    sa.Column('label', sa.String(length=300), nullable=False),
+    sa.Column('body', sa.Text(), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_search_document_row', 'search_document', ['resource', 'row_id'], unique=True)
+    for statement in SEARCH_DDL.get(op.get_bind().dialect.name, []):
+        op.execute(statement)
+    for statement in BACKFILL:
+        op.execute(statement)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute('DROP TABLE IF EXISTS search_fts')
+    op.drop_index('ix_search_document_row', table_name='search_document')
+    op.drop_table('search_document')
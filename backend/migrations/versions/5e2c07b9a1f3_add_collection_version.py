@@ -0,0 +1,30 @@
+"""add collection_version
+
+Revision ID: 5e2c07b9a1f3
+Revises: d4a8f61c93be
+Create Date: 2026-10-18 14:48:26.031877
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e2c07b9a1f3'
+down_revision = 'd4a8f61c93be'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('collection_version',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('resource', sa.String(length=20), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'resource')
+    )
+
+
+def downgrade():
+    op.drop_table('collection_version')
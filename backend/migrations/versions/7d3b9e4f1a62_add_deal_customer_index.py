@@ -0,0 +1,26 @@
+"""add per-customer deal index
+
+Revision ID: 7d3b9e4f1a62
+Revises: 2b8e5d47c6a9
+Create Date: 2026-10-18 17:32:10.480913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7d3b9e4f1a62'
+down_revision = '2b8e5d47c6a9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        op.create_index('ix_deal_user_customer_updated', 'deal', ['user_id', 'customer_id', 'updated_at', 'id'], postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_deal_user_customer_updated', table_name='deal', postgresql_concurrently=True, if_exists=True)
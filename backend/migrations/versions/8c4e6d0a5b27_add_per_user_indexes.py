@@ -0,0 +1,42 @@
+"""add per-user composite indexes
+
+Revision ID: 8c4e6d0a5b27
+Revises: 3f1a2b9c7d41
+Create Date: 2026-10-18 09:40:51.602217
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c4e6d0a5b27'
+down_revision = '3f1a2b9c7d41'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_customer_user_status', 'customer', ['user_id', 'status']),
+    ('ix_customer_user_updated', 'customer', ['user_id', 'updated_at', 'id']),
+    ('ix_contact_user_customer_updated', 'contact', ['user_id', 'customer_id', 'updated_at', 'id']),
+    ('ix_contact_user_updated', 'contact', ['user_id', 'updated_at', 'id']),
+    ('ix_deal_user_stage', 'deal', ['user_id', 'stage']),
+    ('ix_deal_user_updated', 'deal', ['user_id', 'updated_at', 'id']),
+    ('ix_activity_user_customer_updated', 'activity', ['user_id', 'customer_id', 'updated_at', 'id']),
+    ('ix_activity_user_deal_updated', 'activity', ['user_id', 'deal_id', 'updated_at', 'id']),
+    ('ix_activity_user_updated', 'activity', ['user_id', 'updated_at', 'id']),
+]
+
+
+def upgrade():
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction; building
+    # outside one keeps the tables writable while PostgreSQL backfills.
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,34 @@
+"""add tombstone
+
+Revision ID: 9a6f3c18e2d0
+Revises: 5e2c07b9a1f3
+Create Date: 2026-10-18 15:31:12.764118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a6f3c18e2d0'
+down_revision = '5e2c07b9a1f3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('tombstone',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('resource', sa.String(length=20), nullable=False),
+    sa.Column('row_id', sa.Integer(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_tombstone_user_deleted', 'tombstone', ['user_id', 'deleted_at', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_tombstone_user_deleted', table_name='tombstone')
+    op.drop_table('tombstone')
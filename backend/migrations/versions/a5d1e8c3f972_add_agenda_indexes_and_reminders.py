@@ -0,0 +1,50 @@
+"""add the agenda indexes and the reminder table
+
+Revision ID: a5d1e8c3f972
+Revises: e3b7c1d9f540
+Create Date: 2026-10-18 22:14:09.527361
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a5d1e8c3f972'
+down_revision = 'e3b7c1d9f540'
+branch_labels = None
+depends_on = None
+
+ACTIVITY_INDEXES = [
+    ('ix_activity_user_completed_due', ['user_id', 'completed', 'due_date', 'id']),
+    ('ix_activity_completed_due', ['completed', 'due_date']),
+]
+
+
+def upgrade():
+    op.create_table('reminder',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('due_date', sa.DateTime(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('activity_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['activity_id'], ['activity.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_reminder_activity_kind_due', 'reminder', ['activity_id', 'kind', 'due_date'], unique=True)
+    op.create_index('ix_reminder_user_id', 'reminder', ['user_id', 'id'], unique=False)
+    # activity is large and hot; build its indexes without blocking writes
+    with op.get_context().autocommit_block():
+        for name, columns in ACTIVITY_INDEXES:
+            op.create_index(name, 'activity', columns, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, _ in ACTIVITY_INDEXES:
+            op.drop_index(name, table_name='activity', postgresql_concurrently=True, if_exists=True)
+    op.drop_index('ix_reminder_user_id', table_name='reminder')
+    op.drop_index('ix_reminder_activity_kind_due', table_name='reminder')
+    op.drop_table('reminder')
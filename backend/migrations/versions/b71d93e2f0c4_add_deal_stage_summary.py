@@ -0,0 +1,38 @@
+"""add deal_stage_summary
+
+Revision ID: b71d93e2f0c4
+Revises: 8c4e6d0a5b27
+Create Date: 2026-10-18 11:05:37.284903
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b71d93e2f0c4'
+down_revision = '8c4e6d0a5b27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('deal_stage_summary',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('stage', sa.String(length=50), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.Column('total_value', sa.Float(), nullable=False),
+    sa.Column('weighted_value', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'stage')
+    )
+    op.execute(
+        "INSERT INTO deal_stage_summary (user_id, stage, count, total_value, weighted_value) "
+        "SELECT user_id, COALESCE(stage, ''), COUNT(id), COALESCE(SUM(value), 0), "
+        "COALESCE(SUM(value * COALESCE(probability, 0) / 100.0), 0) "
+        "FROM deal GROUP BY user_id, COALESCE(stage, '')"
+    )
+
+
+def downgrade():
+    op.drop_table('deal_stage_summary')
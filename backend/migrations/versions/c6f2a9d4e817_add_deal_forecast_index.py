@@ -0,0 +1,32 @@
+"""replace the deal stage index with a covering forecast index
+
+Revision ID: c6f2a9d4e817
+Revises: 7d3b9e4f1a62
+Create Date: 2026-10-18 19:05:42.118730
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c6f2a9d4e817'
+down_revision = '7d3b9e4f1a62'
+branch_labels = None
+depends_on = None
+
+FORECAST_COLUMNS = ['user_id', 'stage', 'expected_close_date', 'value', 'probability', 'created_at', 'updated_at']
+
+
+def upgrade():
+    # The new index starts with (user_id, stage), so the old one is redundant;
+    # it is dropped only once its replacement exists
+    with op.get_context().autocommit_block():
+        op.create_index('ix_deal_user_stage_close', 'deal', FORECAST_COLUMNS, postgresql_concurrently=True, if_not_exists=True)
+        op.drop_index('ix_deal_user_stage', table_name='deal', postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.create_index('ix_deal_user_stage', 'deal', ['user_id', 'stage'], postgresql_concurrently=True, if_not_exists=True)
+        op.drop_index('ix_deal_user_stage_close', table_name='deal', postgresql_concurrently=True, if_exists=True)
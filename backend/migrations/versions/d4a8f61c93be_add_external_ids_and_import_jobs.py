@@ -0,0 +1,53 @@
+"""add external ids and import jobs
+
+Revision ID: d4a8f61c93be
+Revises: b71d93e2f0c4
+Create Date: 2026-10-18 13:22:09.517460
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4a8f61c93be'
+down_revision = 'b71d93e2f0c4'
+branch_labels = None
+depends_on = None
+
+TABLES = ['customer', 'contact', 'deal', 'activity']
+
+
+def upgrade():
+    for table in TABLES:
+        op.add_column(table, sa.Column('external_id', sa.String(length=100), nullable=True))
+    op.create_table('import_job',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('resource', sa.String(length=20), nullable=False),
+    sa.Column('format', sa.String(length=10), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('bytes_total', sa.BigInteger(), nullable=True),
+    sa.Column('bytes_read', sa.BigInteger(), nullable=True),
+    sa.Column('rows_processed', sa.Integer(), nullable=True),
+    sa.Column('rows_failed', sa.Integer(), nullable=True),
+    sa.Column('errors', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.get_context().autocommit_block():
+        for table in TABLES:
+            op.create_index(f'ix_{table}_user_external', table, ['user_id', 'external_id'], unique=True,
+                            postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for table in reversed(TABLES):
+            op.drop_index(f'ix_{table}_user_external', table_name=table, postgresql_concurrently=True, if_exists=True)
+    op.drop_table('import_job')
+    for table in reversed(TABLES):
+        op.drop_column(table, 'external_id')
@@ -0,0 +1,150 @@
+"""add ON DELETE cascades and the activity archive
+
+Revision ID: e3b7c1d9f540
+Revises: c6f2a9d4e817
+Create Date: 2026-10-18 20:41:27.305118
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3b7c1d9f540'
+down_revision = 'c6f2a9d4e817'
+branch_labels = None
+depends_on = None
+
+# (table, column, referred table, ON DELETE action)
+FOREIGN_KEYS = [
+    ('contact', 'customer_id', 'customer', 'CASCADE'),
+    ('deal', 'customer_id', 'customer', 'CASCADE'),
+    ('activity', 'customer_id', 'customer', 'CASCADE'),
+    ('activity', 'deal_id', 'deal', 'SET NULL'),
+]
+CHILD_INDEXES = [
+    ('ix_contact_customer', 'contact', 'customer_id'),
+    ('ix_deal_customer', 'deal', 'customer_id'),
+    ('ix_activity_customer', 'activity', 'customer_id'),
+    ('ix_activity_deal', 'activity', 'deal_id'),
+]
+# SQLite foreign keys are unnamed; batch mode names them by this convention
+# so they can be dropped
+SQLITE_NAMING = {'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s'}
+ARCHIVE_COLUMNS = 'id, type, subject, description, due_date, completed, customer_id, deal_id, created_at, updated_at, external_id, user_id'
+
+
+def remove_orphans():
+    # Before this revision SQLite deleted customers and deals without their
+    # children. Those rows are deleted now the way the app would have: with
+    # tombstones, without search documents, and with fresh list ETags.
+    bind = op.get_bind()
+    now = datetime.utcnow()
+    changed = bind.execute(sa.text(
+        'UPDATE activity SET deal_id = NULL, updated_at = :now '
+        'WHERE deal_id IS NOT NULL AND deal_id NOT IN (SELECT id FROM deal)'
+    ), {'now': now}).rowcount
+    orphaned = 'customer_id IS NOT NULL AND customer_id NOT IN (SELECT id FROM customer)'
+    orphan_deals = 0
+    for table in ('contact', 'deal', 'activity'):
+        bind.execute(sa.text(
+            f"INSERT INTO tombstone (resource, row_id, deleted_at, user_id) "
+            f"SELECT '{table}', id, :now, user_id FROM {table} WHERE {orphaned}"
+        ), {'now': now})
+        if table != 'activity':
+            bind.execute(sa.text(
+                f"DELETE FROM search_document WHERE resource = '{table}' "
+                f"AND row_id IN (SELECT id FROM {table} WHERE {orphaned})"
+            ))
+        deleted = bind.execute(sa.text(f'DELETE FROM {table} WHERE {orphaned}')).rowcount
+        changed += deleted
+        if table == 'deal':
+            orphan_deals = deleted
+    if orphan_deals:
+        bind.execute(sa.text('DELETE FROM deal_stage_summary'))
+        bind.execute(sa.text(
+            "INSERT INTO deal_stage_summary (user_id, stage, count, total_value, weighted_value) "
+            "SELECT user_id, COALESCE(stage, ''), COUNT(id), COALESCE(SUM(value), 0), "
+            "COALESCE(SUM(value * COALESCE(probability, 0) / 100.0), 0) "
+            "FROM deal GROUP BY user_id, COALESCE(stage, '')"
+        ))
+    if changed:
+        bind.execute(sa.text('UPDATE collection_version SET version = version + 1'))
+
+
+def replace_foreign_keys(ondelete):
+    if op.get_bind().dialect.name == 'sqlite':
+        for table in ('contact', 'deal', 'activity'):
+            with op.batch_alter_table(table, naming_convention=SQLITE_NAMING) as batch_op:
+                for fk_table, column, referred, action in FOREIGN_KEYS:
+                    if fk_table == table:
+                        name = f'fk_{table}_{column}_{referred}'
+                        batch_op.drop_constraint(name, type_='foreignkey')
+                        batch_op.create_foreign_key(name, referred, [column], ['id'], ondelete=ondelete(action))
+        return
+    # PostgreSQL: swap each constraint in one statement; validate_foreign_keys
+    # checks the rows once the swap has committed
+    for table, column, referred, action in FOREIGN_KEYS:
+        name = f'{table}_{column}_fkey'
+        clause = f' ON DELETE {ondelete(action)}' if ondelete(action) else ''
+        op.execute(
+            f'ALTER TABLE {table} DROP CONSTRAINT {name}, '
+            f'ADD CONSTRAINT {name} FOREIGN KEY ({column}) REFERENCES {referred} (id){clause} NOT VALID'
+        )
+
+
+def validate_foreign_keys():
+    # Must run outside the swap's transaction: VALIDATE only takes a SHARE
+    # UPDATE EXCLUSIVE lock, but the swap's ACCESS EXCLUSIVE locks are held
+    # until commit and would block reads and writes for the whole scan
+    if op.get_bind().dialect.name == 'sqlite':
+        return
+    for table, column, _, _ in FOREIGN_KEYS:
+        op.execute(f'ALTER TABLE {table} VALIDATE CONSTRAINT {table}_{column}_fkey')
+
+
+def upgrade():
+    remove_orphans()
+    replace_foreign_keys(lambda action: action)
+    op.create_table('activity_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('type', sa.String(length=50), nullable=False),
+    sa.Column('subject', sa.String(length=200), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('due_date', sa.DateTime(), nullable=True),
+    sa.Column('completed', sa.Boolean(), nullable=True),
+    sa.Column('customer_id', sa.Integer(), nullable=True),
+    sa.Column('deal_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('external_id', sa.String(length=100), nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['customer_id'], ['customer.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['deal_id'], ['deal.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_activity_archive_customer', 'activity_archive', ['customer_id'], unique=False)
+    op.create_index('ix_activity_archive_deal', 'activity_archive', ['deal_id'], unique=False)
+    op.create_index('ix_activity_archive_user_updated', 'activity_archive', ['user_id', 'updated_at', 'id'], unique=False)
+    with op.get_context().autocommit_block():
+        validate_foreign_keys()
+        for name, table, column in CHILD_INDEXES:
+            op.create_index(name, table, [column], postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, column in CHILD_INDEXES:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+    op.execute(f'INSERT INTO activity ({ARCHIVE_COLUMNS}) SELECT {ARCHIVE_COLUMNS} FROM activity_archive')
+    op.drop_index('ix_activity_archive_user_updated', table_name='activity_archive')
+    op.drop_index('ix_activity_archive_deal', table_name='activity_archive')
+    op.drop_index('ix_activity_archive_customer', table_name='activity_archive')
+    op.drop_table('activity_archive')
+    replace_foreign_keys(lambda action: None)
+    with op.get_context().autocommit_block():
+        validate_foreign_keys()
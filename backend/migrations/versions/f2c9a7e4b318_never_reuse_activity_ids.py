@@ -0,0 +1,40 @@
+"""never reuse activity ids on SQLite
+
+Revision ID: f2c9a7e4b318
+Revises: a5d1e8c3f972
+Create Date: 2026-10-19 09:32:51.604417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2c9a7e4b318'
+down_revision = 'a5d1e8c3f972'
+branch_labels = None
+depends_on = None
+
+
+def rebuild_activity(autoincrement):
+    # PostgreSQL ids come from a sequence and are never reused; only SQLite
+    # needs the table rebuilt with AUTOINCREMENT
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    with op.batch_alter_table('activity', recreate='always', table_kwargs={'sqlite_autoincrement': autoincrement}):
+        pass
+
+
+def upgrade():
+    rebuild_activity(True)
+    if op.get_bind().dialect.name == 'sqlite':
+        # Start past every id handed out so far, archived ones included
+        op.execute("DELETE FROM sqlite_sequence WHERE name = 'activity'")
+        op.execute(
+            "INSERT INTO sqlite_sequence (name, seq) SELECT 'activity', "
+            "MAX((SELECT COALESCE(MAX(id), 0) FROM activity), (SELECT COALESCE(MAX(id), 0) FROM activity_archive))"
+        )
+
+
+def downgrade():
+    rebuild_activity(False)
@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from 'react';
-import api from '../../services/api';
+import api, { fetchAll, fetchBatch, fetchRemaining, lookupItems } from '../../services/api';
 import ActivityForm from './ActivityForm';
 import './Activities.css';
 
@@ -12,50 +12,43 @@ const Activities = () => {
   const [editingActivity, setEditingActivity] = useState(null);
 
   useEffect(() => {
-    fetchActivities();
-    fetchCustomers();
-    fetchDeals();
+    loadPage();
   }, []);
 
-  const fetchActivities = async () => {
+  // The first page and the lookups arrive in one request
+  const loadPage = async () => {
     try {
-      const response = await api.get('/activities');
-      setActivities(response.data);
+      const [page, customerLookup, dealLookup] = await fetchBatch(['/activities?limit=500', '/lookup/customers', '/lookup/deals']);
+      setCustomers(lookupItems(customerLookup));
+      setDeals(lookupItems(dealLookup));
+      setActivities(await fetchRemaining('/activities', page));
     } catch (error) {
-      console.error('Error fetching activities:', error);
+      console.error('Error loading activities:', error);
     } finally {
       setLoading(false);
     }
   };
 
-  const fetchCustomers = async () => {
-    try {
-      const response = await api.get('/customers');
-      setCustomers(response.data);
-    } catch (error) {
-      console.error('Error fetching customers:', error);
-    }
-  };
-
-  const fetchDeals = async () => {
+  const fetchActivities = async () => {
     try {
-      const response = await api.get('/deals');
-      setDeals(response.data);
+      setActivities(await fetchAll('/activities'));
     } catch (error) {
-      console.error('Error fetching deals:', error);
+      console.error('Error fetching activities:', error);
+    } finally {
+      setLoading(false);
     }
   };
 
   const getCustomerName = (customerId) => {
     if (!customerId) return '-';
     const customer = customers.find(c => c.id === customerId);
-    return customer ? customer.name : 'Unknown';
+    return customer ? customer.label : 'Unknown';
   };
 
   const getDealTitle = (dealId) => {
     if (!dealId) return '-';
     const deal = deals.find(d => d.id === dealId);
-    return deal ? deal.title : 'Unknown';
+    return deal ? deal.label : 'Unknown';
   };
 
   const handleCreate = () => {
@@ -123,7 +123,7 @@ const ActivityForm = ({ activity, customers, deals, onClose }) => {
               <option value="">Select a customer (optional)</option>
               {customers.map(customer => (
                 <option key={customer.id} value={customer.id}>
-                  {customer.name}
+                  {customer.label}
                 </option>
               ))}
             </select>
@@ -138,7 +138,7 @@ const ActivityForm = ({ activity, customers, deals, onClose }) => {
               <option value="">Select a deal (optional)</option>
               {deals.map(deal => (
                 <option key={deal.id} value={deal.id}>
-                  {deal.title}
+                  {deal.label}
                 </option>
               ))}
             </select>
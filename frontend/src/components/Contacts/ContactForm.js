@@ -120,7 +120,7 @@ const ContactForm = ({ contact, customers, onClose }) => {
               <option value="">Select a customer</option>
               {customers.map(customer => (
                 <option key={customer.id} value={customer.id}>
-                  {customer.name}
+                  {customer.label}
                 </option>
               ))}
             </select>
@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from 'react';
-import api from '../../services/api';
+import api, { fetchAll, fetchBatch, fetchRemaining, lookupItems } from '../../services/api';
 import ContactForm from './ContactForm';
 import './Contacts.css';
 
@@ -11,33 +11,35 @@ const Contacts = () => {
   const [editingContact, setEditingContact] = useState(null);
 
   useEffect(() => {
-    fetchContacts();
-    fetchCustomers();
+    loadPage();
   }, []);
 
-  const fetchContacts = async () => {
+  // The first page and the lookups arrive in one request
+  const loadPage = async () => {
     try {
-      const response = await api.get('/contacts');
-      setContacts(response.data);
+      const [page, customerLookup] = await fetchBatch(['/contacts?limit=500', '/lookup/customers']);
+      setCustomers(lookupItems(customerLookup));
+      setContacts(await fetchRemaining('/contacts', page));
     } catch (error) {
-      console.error('Error fetching contacts:', error);
+      console.error('Error loading contacts:', error);
     } finally {
       setLoading(false);
     }
   };
 
-  const fetchCustomers = async () => {
+  const fetchContacts = async () => {
     try {
-      const response = await api.get('/customers');
-      setCustomers(response.data);
+      setContacts(await fetchAll('/contacts'));
     } catch (error) {
-      console.error('Error fetching customers:', error);
+      console.error('Error fetching contacts:', error);
+    } finally {
+      setLoading(false);
     }
   };
 
   const getCustomerName = (customerId) => {
     const customer = customers.find(c => c.id === customerId);
-    return customer ? customer.name : 'Unknown';
+    return customer ? customer.label : 'Unknown';
   };
 
   const handleCreate = () => {
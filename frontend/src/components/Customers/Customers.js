@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from 'react';
-import api from '../../services/api';
+import api, { fetchAll } from '../../services/api';
 import CustomerForm from './CustomerForm';
 import './Customers.css';
 
@@ -15,8 +15,7 @@ const Customers = () => {
 
   const fetchCustomers = async () => {
     try {
-      const response = await api.get('/customers');
-      setCustomers(response.data);
+      setCustomers(await fetchAll('/customers'));
     } catch (error) {
       console.error('Error fetching customers:', error);
     } finally {
@@ -136,7 +136,7 @@ const DealForm = ({ deal, customers, onClose }) => {
               <option value="">Select a customer</option>
               {customers.map(customer => (
                 <option key={customer.id} value={customer.id}>
-                  {customer.name}
+                  {customer.label}
                 </option>
               ))}
             </select>
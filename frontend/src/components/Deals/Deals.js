@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from 'react';
-import api from '../../services/api';
+import api, { fetchAll, fetchBatch, fetchRemaining, lookupItems } from '../../services/api';
 import DealForm from './DealForm';
 import './Deals.css';
 
@@ -11,33 +11,35 @@ const Deals = () => {
   const [editingDeal, setEditingDeal] = useState(null);
 
   useEffect(() => {
-    fetchDeals();
-    fetchCustomers();
+    loadPage();
   }, []);
 
-  const fetchDeals = async () => {
+  // The first page and the lookups arrive in one request
+  const loadPage = async () => {
     try {
-      const response = await api.get('/deals');
-      setDeals(response.data);
+      const [page, customerLookup] = await fetchBatch(['/deals?limit=500', '/lookup/customers']);
+      setCustomers(lookupItems(customerLookup));
+      setDeals(await fetchRemaining('/deals', page));
     } catch (error) {
-      console.error('Error fetching deals:', error);
+      console.error('Error loading deals:', error);
     } finally {
       setLoading(false);
     }
   };
 
-  const fetchCustomers = async () => {
+  const fetchDeals = async () => {
     try {
-      const response = await api.get('/customers');
-      setCustomers(response.data);
+      setDeals(await fetchAll('/deals'));
     } catch (error) {
-      console.error('Error fetching customers:', error);
+      console.error('Error fetching deals:', error);
+    } finally {
+      setLoading(false);
     }
   };
 
   const getCustomerName = (customerId) => {
     const customer = customers.find(c => c.id === customerId);
-    return customer ? customer.name : 'Unknown';
+    return customer ? customer.label : 'Unknown';
   };
 
   const handleCreate = () => {
@@ -18,3 +18,36 @@ if (token) {
 export default api;
 
 
+
+// List endpoints are cursor-paginated; follow next_cursor to load a whole collection
+export const fetchAll = async (path, params = {}) => {
+  const items = [];
+  let cursor = null;
+  do {
+    const response = await api.get(path, {
+      params: { ...params, limit: 500, ...(cursor ? { cursor } : {}) },
+    });
+    items.push(...response.data.items);
+    cursor = response.data.next_cursor;
+  } while (cursor);
+  return items;
+};
+
+// Loads the pages after an already fetched first page
+export const fetchRemaining = async (path, page) => (
+  page.next_cursor ? [...page.items, ...await fetchAll(path, { cursor: page.next_cursor })] : page.items
+);
+
+// (id, label) pairs for select boxes and name lookups, without full rows
+export const lookupItems = (data) => data.items.map(([id, label]) => ({ id, label }));
+
+// Several GETs in one round trip; resolves to their bodies, in order
+export const fetchBatch = async (paths) => {
+  const response = await api.post('/batch', { requests: paths.map((path) => `/api${path}`) });
+  return response.data.responses.map(({ status, body }, index) => {
+    if (status >= 400) {
+      throw new Error(`${paths[index]} failed with status ${status}: ${body && body.error}`);
+    }
+    return body;
+  });
+};